@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+	# collects items for a short window (or until max_items) and runs them through one batch call
+	def __init__(
+		self,
+		run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+		window: float,
+		max_items: int
+	):
+		self.run_batch = run_batch
+		self.window = window
+		self.max_items = max_items
+
+		self._pending: List[tuple[Any, asyncio.Future]] = []
+		self._timer: Optional[asyncio.Task] = None
+		self._running = set()
+
+		self.batches = 0
+		self.items = 0
+		self.largest_batch = 0
+
+	async def submit(self, item: Any) -> Any:
+		future = asyncio.get_running_loop().create_future()
+		self._pending.append((item, future))
+
+		if len(self._pending) >= self.max_items:
+			self._flush()
+		elif not self._timer:
+			self._timer = asyncio.create_task(self._flush_later())
+
+		return await future
+
+	async def _flush_later(self):
+		await asyncio.sleep(self.window)
+		self._timer = None
+		self._flush()
+
+	def _flush(self):
+		if self._timer:
+			self._timer.cancel()
+			self._timer = None
+
+		# drop anyone who stopped waiting before the batch went out
+		batch = [(item, future) for item, future in self._pending if not future.done()]
+		self._pending = []
+
+		if not batch:
+			return
+
+		self.batches += 1
+		self.items += len(batch)
+		self.largest_batch = max(self.largest_batch, len(batch))
+
+		task = asyncio.create_task(self._run(batch))
+		self._running.add(task)
+		task.add_done_callback(self._running.discard)
+
+	async def _run(self, batch: List[tuple[Any, asyncio.Future]]):
+		try:
+			results = await self.run_batch([item for item, _ in batch])
+		except Exception as e:
+			logger.warning(f"batch of {len(batch)} failed: {type(e).__name__}: {e}")
+			for _, future in batch:
+				if not future.done():
+					future.set_exception(e)
+			return
+
+		for (_, future), result in zip(batch, results):
+			if not future.done():
+				future.set_result(result)
+
+	def get_stats(self) -> dict:
+		return {
+			"batches": self.batches,
+			"items": self.items,
+			"avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+			"largest_batch": self.largest_batch,
+			"requests_saved": self.items - self.batches,
+			"pending": len(self._pending)
+		}
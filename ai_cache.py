@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional, Dict, List
+
+logger = logging.getLogger(__name__)
+
+class CacheStats:
+	def __init__(self):
+		self.memory_hits = 0
+		self.disk_hits = 0
+		self.misses = 0
+
+	@property
+	def hits(self) -> int:
+		return self.memory_hits + self.disk_hits
+
+	def as_dict(self) -> Dict[str, int]:
+		return {
+			"memory_hits": self.memory_hits,
+			"disk_hits": self.disk_hits,
+			"misses": self.misses
+		}
+
+class DiskCache:
+	def __init__(self, path: str, prune_every: int = 200):
+		self.path = path
+		# expired rows are swept every this many writes, otherwise a long running bot grows the file forever
+		self.prune_every = prune_every
+		self._writes = 0
+		self._lock = threading.Lock()
+		self._conn = sqlite3.connect(path, check_same_thread=False)
+		self._conn.execute("PRAGMA journal_mode=WAL")
+		self._conn.execute("PRAGMA synchronous=NORMAL")
+		self._conn.execute(
+			"CREATE TABLE IF NOT EXISTS responses ("
+			"key TEXT PRIMARY KEY, "
+			"value TEXT NOT NULL, "
+			"expires_at REAL NOT NULL)"
+		)
+		self._conn.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+		self._prune()
+		self._conn.commit()
+
+	def _prune(self):
+		self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+
+	def get(self, key: str) -> Optional[tuple[str, float]]:
+		with self._lock:
+			row = self._conn.execute(
+				"SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?",
+				(key, time.time())
+			).fetchone()
+
+		return row
+
+	def set(self, key: str, value: str, expires_at: float):
+		with self._lock:
+			self._conn.execute(
+				"INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+				(key, value, expires_at)
+			)
+
+			self._writes += 1
+			if self._writes % self.prune_every == 0:
+				self._prune()
+
+			self._conn.commit()
+
+	def close(self):
+		with self._lock:
+			self._conn.close()
+
+class ResponseCache:
+	def __init__(self, max_entries: int, ttls: Dict[str, float], db_path: Optional[str] = None):
+		self.max_entries = max_entries
+		self.ttls = ttls
+		self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+		self._disk = DiskCache(db_path) if db_path else None
+		self.stats: Dict[str, CacheStats] = defaultdict(CacheStats)
+
+	def ttl_for(self, call_site: str) -> float:
+		# 0 (or missing) means the call site opted out of caching
+		return self.ttls.get(call_site, 0)
+
+	@staticmethod
+	def make_key(call_site: str, messages: List[dict]) -> str:
+		# whitespace differences shouldn't cause misses
+		normalised = [
+			[message.get("role", ""), " ".join(str(message.get("content", "")).split())]
+			for message in messages
+		]
+		payload = json.dumps([call_site, normalised], ensure_ascii=False, separators=(",", ":"))
+
+		return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+	def _remember(self, key: str, value: str, expires_at: float):
+		self._memory[key] = (value, expires_at)
+		self._memory.move_to_end(key)
+
+		while len(self._memory) > self.max_entries:
+			self._memory.popitem(last=False)
+
+	async def get(self, call_site: str, key: str) -> Optional[str]:
+		now = time.time()
+		stats = self.stats[call_site]
+
+		entry = self._memory.get(key)
+		if entry:
+			value, expires_at = entry
+			if expires_at > now:
+				self._memory.move_to_end(key)
+				stats.memory_hits += 1
+				return value
+
+			del self._memory[key]
+
+		if self._disk:
+			try:
+				row = await asyncio.to_thread(self._disk.get, key)
+			except sqlite3.Error as e:
+				logger.warning(f"disk cache read failed: {e}")
+				row = None
+
+			if row:
+				value, expires_at = row
+				self._remember(key, value, expires_at)
+				stats.disk_hits += 1
+				return value
+
+		stats.misses += 1
+		return None
+
+	async def set(self, call_site: str, key: str, value: str):
+		ttl = self.ttl_for(call_site)
+		if ttl <= 0 or not value:
+			return
+
+		expires_at = time.time() + ttl
+		self._remember(key, value, expires_at)
+
+		if self._disk:
+			try:
+				await asyncio.to_thread(self._disk.set, key, value, expires_at)
+			except sqlite3.Error as e:
+				logger.warning(f"disk cache write failed: {e}")
+
+	def get_stats(self) -> Dict[str, Dict[str, int]]:
+		return {call_site: stats.as_dict() for call_site, stats in self.stats.items()}
+
+	def close(self):
+		if self._disk:
+			self._disk.close()
+			self._disk = None
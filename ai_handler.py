@@ -1,117 +1,735 @@
 import aiohttp
 import logging
 import asyncio
-from config import BOT_CONFIG
-from typing import Optional
+import json
+import time
+import http_client
+import emoji_engine
+from ai_cache import ResponseCache
+from ai_singleflight import SingleFlight
+from ai_batcher import MicroBatcher
+from ai_scheduler import PriorityScheduler, Priority, SchedulerRejected, AdaptiveConcurrency
+from ai_router import Endpoint, EndpointRouter, endpoints_from_config
+from ai_resilience import CircuitBreaker, BreakerState, LatencyTracker, is_retryable, is_overload, backoff_delay
+from config import BOT_CONFIG, AI_CONFIG, GenerationProfile
+from dataclasses import dataclass
+from typing import Optional, AsyncIterator
 import re
 
 logger = logging.getLogger(__name__)
 
+class ThinkTagStripper:
+	OPEN_TAG = "<think>"
+	CLOSE_TAG = "</think>"
+
+	def __init__(self):
+		self.buffer = ""
+		self.thinking = False
+
+	@staticmethod
+	def _partial_tag_length(text: str, tag: str) -> int:
+		# how much of the end of text could be the start of a tag split across chunks
+		lowered = text[-(len(tag) - 1):].lower()
+		for length in range(min(len(lowered), len(tag) - 1), 0, -1):
+			if lowered.endswith(tag[:length]):
+				return length
+
+		return 0
+
+	def feed(self, chunk: str) -> str:
+		self.buffer += chunk
+		visible = []
+
+		while self.buffer:
+			if self.thinking:
+				index = self.buffer.lower().find(self.CLOSE_TAG)
+				if index == -1:
+					keep = self._partial_tag_length(self.buffer, self.CLOSE_TAG)
+					self.buffer = self.buffer[len(self.buffer) - keep:]
+					break
+
+				self.buffer = self.buffer[index + len(self.CLOSE_TAG):]
+				self.thinking = False
+			else:
+				index = self.buffer.lower().find(self.OPEN_TAG)
+				if index == -1:
+					keep = self._partial_tag_length(self.buffer, self.OPEN_TAG)
+					visible.append(self.buffer[:len(self.buffer) - keep])
+					self.buffer = self.buffer[len(self.buffer) - keep:]
+					break
+
+				visible.append(self.buffer[:index])
+				self.buffer = self.buffer[index + len(self.OPEN_TAG):]
+				self.thinking = True
+
+		return "".join(visible)
+
+	def flush(self) -> str:
+		# an unclosed think block never becomes visible
+		remaining = "" if self.thinking else self.buffer
+		self.buffer = ""
+		return remaining
+
+EMOJI_SYSTEM_PROMPT = "Based on the user's message, respond with exactly ONE relevant standard unicode emoji if you can find a suitable one. If no emoji fits well, respond with ONLY 'none'. Only return the emoji character or 'none', NOTHING else."
+
+EMOJI_BATCH_SYSTEM_PROMPT = "You will be given several numbered messages. For each message, pick exactly ONE relevant standard unicode emoji if you can find a suitable one, or 'none' if no emoji fits well. Reply with a numbered list with one line per message, in the same order, in the format `1. <emoji or none>`. NOTHING else."
+
+REACTION_INSTRUCTION = "Start your response with a line in the format `REACTION: <emoji>` containing exactly ONE standard unicode emoji reacting to the message (or `REACTION: none` if nothing fits), then put your reply on the next line."
+
+@dataclass
+class ReactionReply:
+	reply: str
+	reaction: Optional[str] = None
+	structured: bool = False # False when the model ignored the REACTION line
+
+class ReactionHeaderParser:
+	# only the first token after "reaction:" is the emoji, anything after it on the same line is already the reply
+	HEADER_PATTERN = re.compile(r'\**reaction\**[ \t]*:\**[ \t]*(\S*)(\s?)', re.IGNORECASE)
+	MAX_HEADER_LENGTH = 48
+
+	def __init__(self):
+		self.buffer = ""
+		self.decided = False
+		self.structured = False
+		self.reaction: Optional[str] = None
+
+	def _decide(self, pending: str, match: Optional[re.Match]) -> str:
+		self.decided = True
+		self.buffer = ""
+
+		if not match:
+			return pending
+
+		self.structured = True
+		self.reaction = emoji_engine.normalise(match.group(1).strip("`'\"*"))
+		return pending[match.end():].lstrip()
+
+	def feed(self, chunk: str) -> str:
+		if self.decided:
+			return chunk
+
+		self.buffer += chunk
+		pending = self.buffer.lstrip()
+
+		# a header only counts once whitespace ends its token, "REACTION: 😂" might still be mid emoji
+		match = self.HEADER_PATTERN.match(pending)
+		if match and match.group(2):
+			return self._decide(pending, match)
+
+		if "\n" in pending or len(pending) > self.MAX_HEADER_LENGTH:
+			return self._decide(pending, None)
+
+		return ""
+
+	def flush(self) -> str:
+		if self.decided:
+			return ""
+
+		# end of the response, so whatever token is there is the whole of it
+		pending = self.buffer.strip()
+		return self._decide(pending, self.HEADER_PATTERN.match(pending))
+
+	def parse(self, response: str) -> ReactionReply:
+		reply = (self.feed(response) + self.flush()).strip()
+		return ReactionReply(reply, self.reaction, self.structured)
+
 class AIHandler:
-	def __init__(self, api_url: str = BOT_CONFIG.API_URL):
-		self.api_url = api_url
-		self.session = None
+	def __init__(self, api_url: Optional[str] = None):
+		if api_url:
+			endpoints = [Endpoint(api_url)]
+		else:
+			endpoints = endpoints_from_config(BOT_CONFIG.API_ENDPOINTS)
+
+		self.router = EndpointRouter(
+			endpoints,
+			alpha=AI_CONFIG.ROUTER_EWMA_ALPHA,
+			eject_after=AI_CONFIG.ROUTER_EJECT_AFTER_FAILURES,
+			eject_duration=AI_CONFIG.ROUTER_EJECT_SECONDS
+		)
+		self.cache = ResponseCache(
+			max_entries=AI_CONFIG.CACHE_MAX_ENTRIES,
+			ttls=AI_CONFIG.CACHE_TTLS,
+			db_path=AI_CONFIG.CACHE_DB_PATH
+		)
+		self.inflight = SingleFlight()
+		self.scheduler = PriorityScheduler(
+			max_concurrency=AI_CONFIG.MAX_CONCURRENT_REQUESTS,
+			deadlines={Priority[name.upper()]: deadline for name, deadline in AI_CONFIG.QUEUE_DEADLINES.items()},
+			shed_queue_depth=AI_CONFIG.SHED_QUEUE_DEPTH,
+			shed_priority=Priority[AI_CONFIG.SHED_PRIORITY.upper()],
+			max_queue_depth=AI_CONFIG.MAX_QUEUE_DEPTH
+		)
+		self.concurrency = AdaptiveConcurrency(
+			self.scheduler,
+			min_limit=AI_CONFIG.CONCURRENCY_MIN,
+			max_limit=AI_CONFIG.CONCURRENCY_MAX,
+			target_latency=AI_CONFIG.CONCURRENCY_TARGET_LATENCY,
+			increase=AI_CONFIG.CONCURRENCY_INCREASE,
+			decrease_factor=AI_CONFIG.CONCURRENCY_DECREASE_FACTOR,
+			decrease_cooldown=AI_CONFIG.CONCURRENCY_DECREASE_COOLDOWN
+		) if AI_CONFIG.ADAPTIVE_CONCURRENCY else None
+		self.breaker = CircuitBreaker(
+			window=AI_CONFIG.BREAKER_WINDOW,
+			min_requests=AI_CONFIG.BREAKER_MIN_REQUESTS,
+			error_rate=AI_CONFIG.BREAKER_ERROR_RATE,
+			cooldown=AI_CONFIG.BREAKER_COOLDOWN
+		)
+		self.emoji_batcher = MicroBatcher(
+			self._classify_emoji_batch,
+			window=AI_CONFIG.EMOJI_BATCH_WINDOW,
+			max_items=AI_CONFIG.EMOJI_BATCH_MAX_ITEMS
+		)
+		self.latency = LatencyTracker()
+		self.retries = 0
+		self.hedges_sent = 0
 
 	async def __aenter__(self):
-		self.session = aiohttp.ClientSession()
+		await http_client.start()
 		return self
 
 	async def __aexit__(self, exc_type, exc_val, exc_tb):
-		if self.session:
-			await self.session.close()
+		await self.close()
+		await http_client.close()
+
+	@property
+	def session(self) -> aiohttp.ClientSession:
+		# the pool is owned by http_client so every ai call reuses warm connections
+		return http_client.get_session()
+
+	@staticmethod
+	def _build_payload(messages: list, profile_name: str) -> dict:
+		profile = AI_CONFIG.GENERATION_PROFILES.get(profile_name) or GenerationProfile()
+		payload = {
+			"messages": messages
+		}
+
+		if profile.model:
+			payload["model"] = profile.model
+		if profile.max_tokens is not None:
+			payload["max_tokens"] = profile.max_tokens
+		if profile.temperature is not None:
+			payload["temperature"] = profile.temperature
+		if profile.stop:
+			payload["stop"] = list(profile.stop)
+		if profile.reasoning_effort:
+			payload["reasoning_effort"] = profile.reasoning_effort
+
+		return payload
 
-	async def _make_request(self, messages: list) -> Optional[str]:
-		if not self.session:
-			self.session = aiohttp.ClientSession()
+	async def _make_request(
+		self,
+		messages: list,
+		call_site: str = "chat",
+		use_cache: bool = True,
+		profile: str = "chat_short"
+	) -> Optional[str]:
+		payload = self._build_payload(messages, profile)
+		key = self.cache.make_key(f"{call_site}:{profile}", messages)
+		cacheable = use_cache and self.cache.ttl_for(call_site) > 0
+
+		if cacheable:
+			cached = await self.cache.get(call_site, key)
+			if cached is not None:
+				return cached
+
+		async def fetch() -> Optional[str]:
+			try:
+				async with self.scheduler.slot(self._priority_for(call_site)):
+					response = await self._post(payload)
+			except SchedulerRejected as e:
+				logger.info(e)
+				return None
+
+			if response and cacheable:
+				await self.cache.set(call_site, key, response)
+
+			return response
+
+		# identical requests already in flight share the one response
+		return await self.inflight.do(key, fetch)
+
+	@staticmethod
+	def _priority_for(call_site: str) -> Priority:
+		return Priority[AI_CONFIG.CALL_SITE_PRIORITIES.get(call_site, "chat").upper()]
+
+	def _request_headers(self, endpoint: Endpoint, stream: bool = False) -> dict:
+		headers = {
+			"Content-Type": "application/json",
+			**endpoint.headers
+		}
+
+		if stream:
+			headers["Accept"] = "text/event-stream"
+
+		return headers
+
+	async def _post_once(self, payload: dict, endpoint: Endpoint) -> Optional[str]:
+		started = time.monotonic()
+		self.router.start(endpoint)
+		body = endpoint.prepare_payload(payload)
 
 		try:
 			async with self.session.post(
-				self.api_url,
-				headers={
-					"Content-Type": "application/json"
-				},
-				json={
-					"messages": messages
-				},
-				timeout=aiohttp.ClientTimeout(total=5)
+				endpoint.url,
+				headers=self._request_headers(endpoint),
+				json=body,
+				timeout=aiohttp.ClientTimeout(total=AI_CONFIG.REQUEST_TIMEOUT)
 			) as response:
 				response.raise_for_status()
 				data = await response.json()
-				return data.get(
-					"choices",
-					[{}]
-				)[0].get(
-					"message",
-					{}
-				).get(
-					"content"
+		except aiohttp.ClientResponseError as e:
+			if endpoint.reject_optional_params(e.status, body):
+				# backend doesn't understand some generation setting, send it again without them
+				self.router.record_cancelled(endpoint)
+				return await self._post_once(payload, endpoint)
+
+			self.router.record_failure(endpoint)
+			self._record_overload(e)
+			raise
+		except Exception as e:
+			self.router.record_failure(endpoint)
+			self._record_overload(e)
+			raise
+		except BaseException:
+			self.router.record_cancelled(endpoint)
+			raise
+
+		latency = time.monotonic() - started
+		self.latency.record(latency)
+		self.router.record_success(endpoint, latency)
+		if self.concurrency:
+			self.concurrency.record_success(latency)
+
+		return data.get(
+			"choices",
+			[{}]
+		)[0].get(
+			"message",
+			{}
+		).get(
+			"content"
+		)
+
+	def _record_overload(self, error: BaseException):
+		if self.concurrency and is_overload(error):
+			self.concurrency.record_overload()
+
+	async def _post_hedged(self, payload: dict, attempted: list) -> Optional[str]:
+		endpoint = self.router.pick(exclude=attempted)
+		attempted.append(endpoint)
+
+		hedge_delay = self.latency.percentile(0.95)
+		if (
+			not AI_CONFIG.HEDGE_ENABLED or
+			len(self.latency) < AI_CONFIG.HEDGE_MIN_SAMPLES or
+			self.breaker.state != BreakerState.CLOSED
+		):
+			return await self._post_once(payload, endpoint)
+
+		# if the first request is slower than p95, fire a duplicate (at another endpoint if there is one) and take whichever finishes first
+		tasks = {asyncio.create_task(self._post_once(payload, endpoint))}
+		try:
+			done, _ = await asyncio.wait(tasks, timeout=max(hedge_delay, AI_CONFIG.HEDGE_MIN_DELAY))
+			if not done:
+				self.hedges_sent += 1
+				hedge_endpoint = self.router.pick(exclude=attempted)
+				attempted.append(hedge_endpoint)
+				tasks.add(asyncio.create_task(self._post_once(payload, hedge_endpoint)))
+
+			error = None
+			while tasks:
+				done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+				for task in done:
+					if task.exception() is None:
+						return task.result()
+					error = task.exception()
+
+			raise error
+		finally:
+			for task in tasks:
+				task.cancel()
+
+	async def _post(self, payload: dict) -> Optional[str]:
+		attempted = []
+
+		for attempt in range(AI_CONFIG.MAX_RETRIES + 1):
+			if not self.breaker.allow_request():
+				logger.info("circuit breaker open, skipping request")
+				return None
+
+			try:
+				response = await self._post_hedged(payload, attempted)
+				self.breaker.record_success()
+				return response
+			except Exception as e:
+				self.breaker.record_failure()
+
+				if not is_retryable(e) or attempt == AI_CONFIG.MAX_RETRIES:
+					logger.warning(f"AI request failed: {type(e).__name__}: {e}")
+					return None
+
+				delay = backoff_delay(attempt, AI_CONFIG.RETRY_BASE_DELAY, AI_CONFIG.RETRY_MAX_DELAY)
+				logger.info(f"AI request failed ({type(e).__name__}: {e}), retrying in {delay:.2f}s")
+				self.retries += 1
+				await asyncio.sleep(delay)
+			except BaseException:
+				# cancelled (singleflight dropped it, shutdown) - no outcome, but a half open probe has to be released
+				self.breaker.record_cancelled()
+				raise
+
+		return None
+
+	async def _stream_once(self, payload: dict, endpoint: Endpoint) -> AsyncIterator[str]:
+		started = time.monotonic()
+		self.router.start(endpoint)
+		body = endpoint.prepare_payload(payload)
+		body["stream"] = True
+		first_token = None
+
+		try:
+			async with self.session.post(
+				endpoint.url,
+				headers=self._request_headers(endpoint, stream=True),
+				json=body,
+				timeout=aiohttp.ClientTimeout(
+					total=AI_CONFIG.STREAM_TIMEOUT,
+					sock_read=AI_CONFIG.STREAM_READ_TIMEOUT
 				)
+			) as response:
+				response.raise_for_status()
+
+				if response.content_type != "text/event-stream":
+					# backend ignored stream=true, just hand over the whole thing
+					data = await response.json(content_type=None)
+					content = data.get("choices", [{}])[0].get("message", {}).get("content")
+					first_token = time.monotonic()
+					if content:
+						yield content
+				else:
+					async for raw_line in response.content:
+						line = raw_line.decode("utf-8", errors="ignore").strip()
+						if not line.startswith("data:"):
+							continue
 
-		except asyncio.TimeoutError as e:
-			logger.warning(f"Timed out: {e}")
-			return None
-		except aiohttp.ClientError as e:
-			logger.error(e)
-			return None
+						data_line = line[len("data:"):].strip()
+						if data_line == "[DONE]":
+							break
+
+						try:
+							data = json.loads(data_line)
+						except json.JSONDecodeError:
+							continue
+
+						delta = (data.get("choices") or [{}])[0].get("delta", {}).get("content")
+						if delta:
+							if first_token is None:
+								first_token = time.monotonic()
+							yield delta
+		except aiohttp.ClientResponseError as e:
+			if endpoint.reject_optional_params(e.status, body):
+				self.router.record_cancelled(endpoint)
+				async for chunk in self._stream_once(payload, endpoint):
+					yield chunk
+				return
+
+			self.router.record_failure(endpoint)
+			self._record_overload(e)
+			raise
 		except Exception as e:
-			logger.error(e)
-			return None
+			self.router.record_failure(endpoint)
+			self._record_overload(e)
+			raise
+		except BaseException:
+			self.router.record_cancelled(endpoint)
+			raise
+
+		self.router.record_success(endpoint, time.monotonic() - started)
+		if self.concurrency:
+			# streams run as long as the reply is, time to first token is what says how loaded the backend is
+			self.concurrency.record_success((first_token or time.monotonic()) - started)
+
+	async def _post_stream(self, payload: dict) -> AsyncIterator[str]:
+		attempted = []
+
+		for attempt in range(AI_CONFIG.MAX_RETRIES + 1):
+			if not self.breaker.allow_request():
+				logger.info("circuit breaker open, skipping stream")
+				return
+
+			endpoint = self.router.pick(exclude=attempted)
+			attempted.append(endpoint)
+
+			started = False
+			try:
+				async for chunk in self._stream_once(payload, endpoint):
+					started = True
+					yield chunk
+
+				self.breaker.record_success()
+				return
+			except Exception as e:
+				self.breaker.record_failure()
+
+				# once text has been shown a retry would repeat it, so only retry before the first chunk
+				if started or not is_retryable(e) or attempt == AI_CONFIG.MAX_RETRIES:
+					logger.warning(f"AI stream failed: {type(e).__name__}: {e}")
+					return
+
+				delay = backoff_delay(attempt, AI_CONFIG.RETRY_BASE_DELAY, AI_CONFIG.RETRY_MAX_DELAY)
+				logger.info(f"AI stream failed ({type(e).__name__}: {e}), retrying in {delay:.2f}s")
+				self.retries += 1
+				await asyncio.sleep(delay)
+			except BaseException:
+				# cancelled, or the consumer stopped reading (GeneratorExit) - release a half open probe
+				self.breaker.record_cancelled()
+				raise
+
+	def fallback_reply(self) -> str:
+		if self.breaker.state != BreakerState.CLOSED:
+			return AI_CONFIG.BREAKER_OPEN_REPLY
+
+		return "*timed out*"
 
 	def _clean_thinking_tags(self, response: str) -> str:
 		if not response:
 			return response
 
 		cleaned = re.sub(r'<think>.*?</think>', '', response, flags=re.IGNORECASE | re.DOTALL)
+		# a token cap can cut the model off mid-thought
+		cleaned = re.sub(r'<think>.*\Z', '', cleaned, flags=re.IGNORECASE | re.DOTALL)
 
 		cleaned = cleaned.strip()
 
 		return cleaned
 
-	async def generate_response(self, user_message: str) -> str:
-		messages = [
-			{
-				"role": "user",
-				"content": user_message
-			}
-		]
+	@staticmethod
+	def _build_messages(user_message: str, system_prompt: Optional[str] = None) -> list:
+		# static instructions go in the system message so backends with prefix caching can reuse them
+		messages = []
+
+		if system_prompt:
+			messages.append({
+				"role": "system",
+				"content": system_prompt
+			})
+
+		messages.append({
+			"role": "user",
+			"content": user_message
+		})
+
+		return messages
+
+	@staticmethod
+	def _with_reaction_instruction(system_prompt: Optional[str]) -> str:
+		if not system_prompt:
+			return REACTION_INSTRUCTION
+
+		return f"{system_prompt}\n\n{REACTION_INSTRUCTION}"
+
+	async def generate_response(
+		self,
+		user_message: str,
+		call_site: str = "chat",
+		use_cache: bool = True,
+		profile: str = "chat_short",
+		system_prompt: Optional[str] = None,
+		fallback: bool = True
+	) -> str:
+		messages = self._build_messages(user_message, system_prompt)
 
-		response = await self._make_request(messages)
+		response = await self._make_request(messages, call_site, use_cache, profile)
 
 		# logger.info(response)
 
 		if response:
 			response = self._clean_thinking_tags(response)
 
-		return response or "*timed out*"
+		# fallback=False returns an empty string on failure so the caller can tell
+		return response or (self.fallback_reply() if fallback else "")
+
+	async def generate_response_with_reaction(
+		self,
+		user_message: str,
+		call_site: str = "chat",
+		profile: str = "chat_short",
+		system_prompt: Optional[str] = None,
+		fallback: bool = True
+	) -> ReactionReply:
+		# one completion for both the reply and the reaction, instead of a second emoji request
+		messages = self._build_messages(user_message, self._with_reaction_instruction(system_prompt))
+
+		response = await self._make_request(messages, call_site, profile=profile)
+
+		if not response:
+			return ReactionReply(self.fallback_reply() if fallback else "")
+
+		result = ReactionHeaderParser().parse(self._clean_thinking_tags(response))
+
+		if not result.reply and fallback:
+			result.reply = self.fallback_reply()
+
+		return result
+
+	async def stream_response(
+		self,
+		user_message: str,
+		call_site: str = "chat",
+		reaction: Optional[ReactionHeaderParser] = None,
+		profile: str = "chat_short",
+		system_prompt: Optional[str] = None
+	) -> AsyncIterator[str]:
+		if reaction:
+			system_prompt = self._with_reaction_instruction(system_prompt)
+
+		messages = self._build_messages(user_message, system_prompt)
+
+		stripper = ThinkTagStripper()
+
+		try:
+			async with self.scheduler.slot(self._priority_for(call_site)):
+				async for chunk in self._post_stream(self._build_payload(messages, profile)):
+					visible = stripper.feed(chunk)
+					if visible and reaction:
+						visible = reaction.feed(visible)
+					if visible:
+						yield visible
+		except SchedulerRejected as e:
+			logger.info(e)
+			return
+
+		remaining = stripper.flush()
+		if reaction:
+			remaining = reaction.feed(remaining) + reaction.flush()
+		if remaining:
+			yield remaining
 
 	async def generate_emoji(self, user_message: str) -> str:
-		prompt = f"Based on this message: '{user_message}', response with exactly ONE relevant standard unicode emoji if you can find a suitable one. If no emoji fits well, respond with ONLY 'none'. Only return the emoji character or 'none', NOTHING else."
+		messages = self._build_messages(user_message, EMOJI_SYSTEM_PROMPT)
 
-		messages = [
-			{
-				"role": "user",
-				"content": prompt
-			}
-		]
+		if not AI_CONFIG.EMOJI_BATCH_ENABLED:
+			response = await self._make_request(messages, "emoji", profile="emoji")
 
-		response = await self._make_request(messages)
+			if response:
+				response = emoji_engine.normalise(self._clean_thinking_tags(response))
 
-		if response:
-			response = self._clean_thinking_tags(response)
+			return response or "none"
 
-		return response or "none"
+		# same key as the unbatched request so both share cached results
+		key = self.cache.make_key("emoji:emoji", messages)
+
+		cached = await self.cache.get("emoji", key)
+		if cached is not None:
+			return cached
+
+		async def fetch() -> Optional[str]:
+			response = await self.emoji_batcher.submit(user_message)
+
+			if response:
+				await self.cache.set("emoji", key, response)
+
+			return response
+
+		return await self.inflight.do(key, fetch) or "none"
+
+	async def _classify_emoji_batch(self, user_messages: list) -> list:
+		if len(user_messages) == 1:
+			payload = self._build_payload(self._build_messages(user_messages[0], EMOJI_SYSTEM_PROMPT), "emoji")
+		else:
+			numbered = "\n".join(
+				f"{index}. {' '.join(message.split())[:AI_CONFIG.EMOJI_BATCH_ITEM_CHARS]}"
+				for index, message in enumerate(user_messages, start=1)
+			)
+			payload = self._build_payload(self._build_messages(f"Messages:\n{numbered}", EMOJI_BATCH_SYSTEM_PROMPT), "emoji_batch")
+			payload["max_tokens"] = payload.get("max_tokens", 16) * len(user_messages)
+
+		try:
+			async with self.scheduler.slot(self._priority_for("emoji")):
+				response = await self._post(payload)
+		except SchedulerRejected as e:
+			logger.info(e)
+			response = None
+
+		if not response:
+			return ["none"] * len(user_messages)
+
+		response = self._clean_thinking_tags(response)
+
+		if len(user_messages) == 1:
+			return [emoji_engine.normalise(response) or "none"]
+
+		return self._parse_numbered_emojis(response, len(user_messages))
+
+	@staticmethod
+	def _parse_numbered_emojis(response: str, count: int) -> list:
+		found = {}
+		for match in re.finditer(r'^\s*(\d+)\s*[.):\-]\s*(.+?)\s*$', response, re.MULTILINE):
+			found.setdefault(int(match.group(1)), emoji_engine.normalise(match.group(2).strip("`\"'* ")))
+
+		# anything the model skipped, mangled or made up just gets no reaction
+		return [found.get(index) or "none" for index in range(1, count + 1)]
+
+	def get_stats(self) -> dict:
+		return {
+			"cache": self.cache.get_stats(),
+			"inflight": self.inflight.get_stats(),
+			"emoji_batcher": self.emoji_batcher.get_stats(),
+			"scheduler": self.scheduler.get_stats(),
+			"concurrency": self.concurrency.get_stats() if self.concurrency else None,
+			"breaker": self.breaker.get_stats(),
+			"endpoints": self.router.get_stats(),
+			"latency": {
+				"p50_ms": round((self.latency.percentile(0.5) or 0) * 1000),
+				"p95_ms": round((self.latency.percentile(0.95) or 0) * 1000),
+				"retries": self.retries,
+				"hedges_sent": self.hedges_sent
+			}
+		}
 
 	async def close(self):
-		if self.session:
-			await self.session.close()
+		self.cache.close()
 
 _ai_handler = AIHandler()
 
-async def generate_ai_response(user_message: str) -> str:
-	return await _ai_handler.generate_response(user_message)
+async def generate_ai_response(
+	user_message: str,
+	call_site: str = "chat",
+	use_cache: bool = True,
+	profile: str = "chat_short",
+	system_prompt: Optional[str] = None,
+	fallback: bool = True
+) -> str:
+	return await _ai_handler.generate_response(user_message, call_site, use_cache, profile, system_prompt, fallback)
+
+async def generate_ai_response_with_reaction(
+	user_message: str,
+	call_site: str = "chat",
+	profile: str = "chat_short",
+	system_prompt: Optional[str] = None,
+	fallback: bool = True
+) -> ReactionReply:
+	return await _ai_handler.generate_response_with_reaction(user_message, call_site, profile, system_prompt, fallback)
+
+def stream_ai_response(
+	user_message: str,
+	call_site: str = "chat",
+	reaction: Optional[ReactionHeaderParser] = None,
+	profile: str = "chat_short",
+	system_prompt: Optional[str] = None
+) -> AsyncIterator[str]:
+	return _ai_handler.stream_response(user_message, call_site, reaction, profile, system_prompt)
 
 async def generate_ai_emoji(user_message: str) -> str:
 	return await _ai_handler.generate_emoji(user_message)
 
+def get_stats() -> dict:
+	return _ai_handler.get_stats()
+
+def get_breaker_state() -> str:
+	return _ai_handler.breaker.state.value
+
+def fallback_reply() -> str:
+	return _ai_handler.fallback_reply()
+
 async def close():
 	await _ai_handler.close()
@@ -0,0 +1,137 @@
+import asyncio
+import aiohttp
+import logging
+import random
+import time
+from collections import deque
+from enum import Enum
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class BreakerState(Enum):
+	CLOSED = "closed"
+	OPEN = "open"
+	HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+	pass
+
+class CircuitBreaker:
+	def __init__(self, window: int, min_requests: int, error_rate: float, cooldown: float):
+		self.window = window
+		self.min_requests = min_requests
+		self.error_rate = error_rate
+		self.cooldown = cooldown
+
+		self._outcomes = deque(maxlen=window) # True = success
+		self._state = BreakerState.CLOSED
+		self._opened_at = 0.0
+		self._probe_in_flight = False
+
+		self.times_opened = 0
+		self.rejected = 0
+
+	@property
+	def state(self) -> BreakerState:
+		if self._state == BreakerState.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+			self._state = BreakerState.HALF_OPEN
+			self._probe_in_flight = False
+
+		return self._state
+
+	def allow_request(self) -> bool:
+		state = self.state
+
+		if state == BreakerState.CLOSED:
+			return True
+
+		# half open lets exactly one probe through to see if the backend recovered
+		if state == BreakerState.HALF_OPEN and not self._probe_in_flight:
+			self._probe_in_flight = True
+			return True
+
+		self.rejected += 1
+		return False
+
+	def _open(self):
+		self._state = BreakerState.OPEN
+		self._opened_at = time.monotonic()
+		self._probe_in_flight = False
+		self.times_opened += 1
+		logger.warning(f"circuit breaker opened, failing fast for {self.cooldown}s")
+
+	def record_success(self):
+		if self._state == BreakerState.HALF_OPEN:
+			logger.info("circuit breaker closed, backend recovered")
+			self._state = BreakerState.CLOSED
+			self._outcomes.clear()
+			self._probe_in_flight = False
+
+		self._outcomes.append(True)
+
+	def record_cancelled(self):
+		# a cancelled probe never finds out if the backend recovered, let the next request try instead
+		if self._state == BreakerState.HALF_OPEN:
+			self._probe_in_flight = False
+
+	def record_failure(self):
+		if self._state == BreakerState.HALF_OPEN:
+			self._open()
+			return
+
+		self._outcomes.append(False)
+
+		if self._state == BreakerState.CLOSED and len(self._outcomes) >= self.min_requests:
+			failures = self._outcomes.count(False)
+			if failures / len(self._outcomes) >= self.error_rate:
+				self._open()
+
+	def get_stats(self) -> dict:
+		return {
+			"state": self.state.value,
+			"recent_error_rate": round(self._outcomes.count(False) / len(self._outcomes), 2) if self._outcomes else 0.0,
+			"times_opened": self.times_opened,
+			"rejected": self.rejected
+		}
+
+class LatencyTracker:
+	def __init__(self, size: int = 200):
+		self._samples = deque(maxlen=size)
+
+	def record(self, latency: float):
+		self._samples.append(latency)
+
+	def __len__(self) -> int:
+		return len(self._samples)
+
+	def percentile(self, percentile: float) -> Optional[float]:
+		if not self._samples:
+			return None
+
+		ordered = sorted(self._samples)
+		index = min(len(ordered) - 1, int(len(ordered) * percentile))
+		return ordered[index]
+
+def is_retryable(error: BaseException) -> bool:
+	if isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+		return True
+
+	if isinstance(error, aiohttp.ClientResponseError):
+		return error.status == 429 or error.status >= 500
+
+	return False
+
+def is_overload(error: BaseException) -> bool:
+	# signs the backend itself is struggling, as opposed to a dead connection or a bad request
+	if isinstance(error, asyncio.TimeoutError):
+		return True
+
+	if isinstance(error, aiohttp.ClientResponseError):
+		return error.status == 429 or error.status >= 500
+
+	return False
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+	# full jitter so a bunch of retries don't all land at the same moment
+	return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,145 @@
+import logging
+import os
+import time
+from typing import Optional, List, Iterable
+
+logger = logging.getLogger(__name__)
+
+class Endpoint:
+	# generation settings some openai compatible backends reject with a 400
+	OPTIONAL_PARAMS = ("reasoning_effort", "stop")
+
+	def __init__(self, url: str, weight: float = 1.0, api_key: Optional[str] = None):
+		self.url = url
+		self.weight = max(weight, 0.01)
+		self.api_key = api_key
+		self.unsupported_params = set()
+
+		self.ewma_latency: Optional[float] = None
+		self.success_rate = 1.0
+		self.in_flight = 0
+		self.consecutive_failures = 0
+		self.ejected_until = 0.0
+
+		self.requests = 0
+		self.failures = 0
+		self.ejections = 0
+
+	@property
+	def headers(self) -> dict:
+		if not self.api_key:
+			return {}
+
+		return {
+			"Authorization": f"Bearer {self.api_key}"
+		}
+
+	def prepare_payload(self, payload: dict) -> dict:
+		return {key: value for key, value in payload.items() if key not in self.unsupported_params}
+
+	def reject_optional_params(self, status: int, body: dict) -> bool:
+		if status not in (400, 422):
+			return False
+
+		rejected = [param for param in self.OPTIONAL_PARAMS if param in body]
+		if not rejected:
+			return False
+
+		self.unsupported_params.update(rejected)
+		logger.warning(f"{self.url} rejected the request, no longer sending {', '.join(rejected)}")
+		return True
+
+	def is_ejected(self, now: float) -> bool:
+		return now < self.ejected_until
+
+	def score(self, default_latency: float) -> float:
+		# lower is better - slow, busy, flaky or low weight endpoints all score worse
+		latency = self.ewma_latency if self.ewma_latency is not None else default_latency
+		return latency * (1 + self.in_flight) / (self.weight * max(self.success_rate, 0.05))
+
+	def get_stats(self, now: float) -> dict:
+		return {
+			"weight": self.weight,
+			"ewma_latency_ms": round(self.ewma_latency * 1000) if self.ewma_latency is not None else None,
+			"success_rate": round(self.success_rate, 3),
+			"in_flight": self.in_flight,
+			"requests": self.requests,
+			"failures": self.failures,
+			"ejections": self.ejections,
+			"ejected": self.is_ejected(now)
+		}
+
+class EndpointRouter:
+	def __init__(
+		self,
+		endpoints: List[Endpoint],
+		alpha: float,
+		eject_after: int,
+		eject_duration: float,
+		default_latency: float = 1.0
+	):
+		if not endpoints:
+			raise ValueError("at least one endpoint is required")
+
+		self.endpoints = endpoints
+		self.alpha = alpha
+		self.eject_after = eject_after
+		self.eject_duration = eject_duration
+		self.default_latency = default_latency
+
+	def pick(self, exclude: Iterable[Endpoint] = ()) -> Endpoint:
+		now = time.monotonic()
+		excluded = set(exclude)
+
+		available = [endpoint for endpoint in self.endpoints if not endpoint.is_ejected(now)]
+		preferred = [endpoint for endpoint in available if endpoint not in excluded]
+
+		if preferred:
+			return min(preferred, key=lambda endpoint: endpoint.score(self.default_latency))
+
+		if available:
+			return min(available, key=lambda endpoint: endpoint.score(self.default_latency))
+
+		# everything is ejected, so try whichever comes back soonest rather than failing outright
+		return min(self.endpoints, key=lambda endpoint: endpoint.ejected_until)
+
+	def start(self, endpoint: Endpoint):
+		endpoint.in_flight += 1
+		endpoint.requests += 1
+
+	def record_success(self, endpoint: Endpoint, latency: float):
+		endpoint.in_flight -= 1
+		endpoint.consecutive_failures = 0
+
+		if endpoint.ewma_latency is None:
+			endpoint.ewma_latency = latency
+		else:
+			endpoint.ewma_latency += self.alpha * (latency - endpoint.ewma_latency)
+
+		endpoint.success_rate += self.alpha * (1.0 - endpoint.success_rate)
+
+	def record_failure(self, endpoint: Endpoint):
+		endpoint.in_flight -= 1
+		endpoint.failures += 1
+		endpoint.consecutive_failures += 1
+		endpoint.success_rate += self.alpha * (0.0 - endpoint.success_rate)
+
+		if endpoint.consecutive_failures >= self.eject_after:
+			endpoint.ejected_until = time.monotonic() + self.eject_duration
+			endpoint.consecutive_failures = 0
+			endpoint.ejections += 1
+			logger.warning(f"ejected {endpoint.url} for {self.eject_duration}s")
+
+	def record_cancelled(self, endpoint: Endpoint):
+		endpoint.in_flight -= 1
+
+	def get_stats(self) -> dict:
+		now = time.monotonic()
+		return {endpoint.url: endpoint.get_stats(now) for endpoint in self.endpoints}
+
+def endpoints_from_config(entries: List[tuple]) -> List[Endpoint]:
+	# entries are (url, weight, name of the env var holding the api key or None)
+	return [
+		Endpoint(url, weight, os.getenv(key_env) if key_env else None)
+		for url, weight, key_env in entries
+	]
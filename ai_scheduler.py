@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Dict, Deque, AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+class Priority(IntEnum):
+	# lower value = served first
+	MODERATION = 0
+	CHAT = 1
+	ROLEPLAY = 2
+	GAMES = 3
+	EMOJI = 4
+
+class SchedulerRejected(Exception):
+	pass
+
+class ClassStats:
+	def __init__(self):
+		self.submitted = 0
+		self.shed = 0
+		self.expired = 0
+		self.dispatched = 0
+		self.total_wait = 0.0
+		self.max_wait = 0.0
+
+	def record_wait(self, wait: float):
+		self.dispatched += 1
+		self.total_wait += wait
+		self.max_wait = max(self.max_wait, wait)
+
+	def as_dict(self, depth: int) -> dict:
+		return {
+			"depth": depth,
+			"submitted": self.submitted,
+			"shed": self.shed,
+			"expired": self.expired,
+			"avg_wait_ms": round(self.total_wait / self.dispatched * 1000, 1) if self.dispatched else 0.0,
+			"max_wait_ms": round(self.max_wait * 1000, 1)
+		}
+
+class _Waiter:
+	__slots__ = ("future", "enqueued_at")
+
+	def __init__(self, future: asyncio.Future):
+		self.future = future
+		self.enqueued_at = time.monotonic()
+
+class PriorityScheduler:
+	def __init__(
+		self,
+		max_concurrency: int,
+		deadlines: Dict[Priority, float],
+		shed_queue_depth: int,
+		shed_priority: Priority,
+		max_queue_depth: Optional[int] = None
+	):
+		self.max_concurrency = max_concurrency
+		self.deadlines = deadlines
+		self.shed_queue_depth = shed_queue_depth
+		self.shed_priority = shed_priority
+		self.max_queue_depth = max_queue_depth
+
+		self.active = 0
+		self.queues: Dict[Priority, Deque[_Waiter]] = {priority: deque() for priority in Priority}
+		self.stats: Dict[Priority, ClassStats] = {priority: ClassStats() for priority in Priority}
+
+	def queued(self) -> int:
+		return sum(len(queue) for queue in self.queues.values())
+
+	def _next_waiter(self):
+		for priority in Priority:
+			queue = self.queues[priority]
+			while queue:
+				waiter = queue.popleft()
+				# skip anyone who already gave up
+				if not waiter.future.done():
+					return priority, waiter
+
+		return None, None
+
+	def _dispatch(self):
+		while self.active < self.max_concurrency:
+			priority, waiter = self._next_waiter()
+			if not waiter:
+				return
+
+			self.active += 1
+			self.stats[priority].record_wait(time.monotonic() - waiter.enqueued_at)
+			waiter.future.set_result(True)
+
+	async def acquire(self, priority: Priority):
+		stats = self.stats[priority]
+		stats.submitted += 1
+
+		if self.active < self.max_concurrency and not self.queued():
+			self.active += 1
+			stats.record_wait(0.0)
+			return
+
+		# under pressure the cosmetic stuff gets dropped first
+		if priority >= self.shed_priority and self.queued() >= self.shed_queue_depth:
+			stats.shed += 1
+			raise SchedulerRejected(f"shed {priority.name.lower()} request")
+
+		if self.max_queue_depth is not None and self.queued() >= self.max_queue_depth:
+			stats.shed += 1
+			raise SchedulerRejected(f"queue full, rejected {priority.name.lower()} request")
+
+		waiter = _Waiter(asyncio.get_running_loop().create_future())
+		self.queues[priority].append(waiter)
+
+		try:
+			async with asyncio.timeout(self.deadlines.get(priority)):
+				await waiter.future
+		except (TimeoutError, asyncio.CancelledError) as e:
+			if waiter.future.done() and not waiter.future.cancelled():
+				# got handed a slot right as we gave up
+				if isinstance(e, asyncio.CancelledError):
+					self.release()
+					raise
+				return
+
+			waiter.future.cancel()
+			try:
+				self.queues[priority].remove(waiter)
+			except ValueError:
+				pass
+
+			if isinstance(e, asyncio.CancelledError):
+				raise
+
+			stats.expired += 1
+			raise SchedulerRejected(f"{priority.name.lower()} request missed its queue deadline")
+
+	def release(self):
+		self.active -= 1
+		self._dispatch()
+
+	def set_max_concurrency(self, max_concurrency: int):
+		self.max_concurrency = max_concurrency
+		self._dispatch()
+
+	@asynccontextmanager
+	async def slot(self, priority: Priority) -> AsyncIterator[None]:
+		await self.acquire(priority)
+		try:
+			yield
+		finally:
+			self.release()
+
+	def get_stats(self) -> dict:
+		return {
+			"active": self.active,
+			"max_concurrency": self.max_concurrency,
+			"queued": self.queued(),
+			"classes": {
+				priority.name.lower(): self.stats[priority].as_dict(len(self.queues[priority]))
+				for priority in Priority
+			}
+		}
+
+class AdaptiveConcurrency:
+	# aimd - creep the in flight limit up while the backend keeps up, halve it when it pushes back
+	def __init__(
+		self,
+		scheduler: PriorityScheduler,
+		min_limit: int,
+		max_limit: int,
+		target_latency: float,
+		increase: float = 1.0,
+		decrease_factor: float = 0.5,
+		decrease_cooldown: float = 2.0
+	):
+		self.scheduler = scheduler
+		self.min_limit = min_limit
+		self.max_limit = max_limit
+		self.target_latency = target_latency
+		self.increase = increase
+		self.decrease_factor = decrease_factor
+		self.decrease_cooldown = decrease_cooldown
+
+		self.limit = float(min(max(scheduler.max_concurrency, min_limit), max_limit))
+		self._last_decrease = 0.0
+
+		self.increases = 0
+		self.decreases = 0
+
+		self._apply()
+
+	def _apply(self):
+		limit = int(self.limit)
+		if limit != self.scheduler.max_concurrency:
+			self.scheduler.set_max_concurrency(limit)
+
+	def record_success(self, latency: float):
+		if latency > self.target_latency:
+			return
+
+		# only grow when the current limit is actually being hit, otherwise an idle bot ratchets up to max
+		if self.scheduler.active < int(self.limit) and not self.scheduler.queued():
+			return
+
+		# +increase per limit's worth of fast responses, roughly once per round trip
+		previous = int(self.limit)
+		self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+		if int(self.limit) > previous:
+			self.increases += 1
+			self._apply()
+
+	def record_overload(self):
+		now = time.monotonic()
+
+		# a burst of failures from the same round trip should only count once
+		if now - self._last_decrease < self.decrease_cooldown:
+			return
+
+		self._last_decrease = now
+		previous = int(self.limit)
+		self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+		if int(self.limit) < previous:
+			self.decreases += 1
+			logger.info(f"backend overloaded, concurrency limit {previous} -> {int(self.limit)}")
+			self._apply()
+
+	def get_stats(self) -> dict:
+		return {
+			"limit": int(self.limit),
+			"min": self.min_limit,
+			"max": self.max_limit,
+			"increases": self.increases,
+			"decreases": self.decreases
+		}
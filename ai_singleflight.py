@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+	__slots__ = ("task", "waiters")
+
+	def __init__(self, task: asyncio.Task):
+		self.task = task
+		self.waiters = 0
+
+class SingleFlight:
+	def __init__(self):
+		self._calls: Dict[str, _Call] = {}
+
+		self.executed = 0
+		self.coalesced = 0 # requests that piggybacked on one already in flight, aka calls saved
+		self.abandoned = 0
+
+	def _forget(self, key: str, call: _Call):
+		if self._calls.get(key) is call:
+			del self._calls[key]
+
+	async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+		call = self._calls.get(key)
+
+		if call:
+			self.coalesced += 1
+		else:
+			call = _Call(asyncio.create_task(factory()))
+			call.task.add_done_callback(lambda _: self._forget(key, call))
+			self._calls[key] = call
+			self.executed += 1
+
+		call.waiters += 1
+		try:
+			# shielded so one impatient caller can't cancel the request for everyone else
+			return await asyncio.shield(call.task)
+		finally:
+			call.waiters -= 1
+
+			if call.waiters == 0 and not call.task.done():
+				# everyone left, no point finishing the request
+				call.task.cancel()
+				self._forget(key, call)
+				self.abandoned += 1
+				logger.debug(f"abandoned in-flight request {key[:8]}")
+
+	def get_stats(self) -> Dict[str, int]:
+		return {
+			"in_flight": len(self._calls),
+			"executed": self.executed,
+			"coalesced": self.coalesced,
+			"abandoned": self.abandoned
+		}
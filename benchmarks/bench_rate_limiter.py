@@ -0,0 +1,75 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RatePolicy
+from rate_limiter import RateLimiter, MemoryBackend, SQLiteBackend
+
+# per check cost of the shared limiter as the number of tracked keys grows
+# python benchmarks/bench_rate_limiter.py --keys 1000 100000 1000000 3000000
+# python benchmarks/bench_rate_limiter.py --backend sqlite --keys 1000 100000 --checks 20000
+
+class FakeClock:
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self) -> float:
+		return self.now
+
+def make_backend(name: str, directory: str):
+	if name == "sqlite":
+		return SQLiteBackend(os.path.join(directory, f"bench-{time.time_ns()}.db"))
+
+	return MemoryBackend()
+
+def bench(backend, keys: int, checks: int, seed: int) -> tuple[float, int]:
+	clock = FakeClock()
+	limiter = RateLimiter({"user": RatePolicy(10, 60), "guild": RatePolicy(40, 60)}, backend=backend, clock=clock)
+	rng = random.Random(seed)
+
+	# fill up to the target key count, one check per key
+	if isinstance(backend, SQLiteBackend):
+		backend._conn.executemany(
+			"INSERT INTO rate_limits (policy, key, tat) VALUES ('user', ?, 6)",
+			((str(key),) for key in range(keys))
+		)
+	else:
+		for key in range(keys):
+			limiter.check("user", key)
+
+	# 1ms of fake time per check, so keys slowly go idle and get evicted like they would in production
+	sample = [rng.randrange(keys) for _ in range(checks)]
+	started = time.perf_counter()
+	for key in sample:
+		clock.now += 0.001
+		# what a message actually costs - user and guild in one go
+		limiter.check_many((("user", key), ("guild", key % 1000)))
+	elapsed = time.perf_counter() - started
+
+	return elapsed / checks * 1e9, backend.count("user")
+
+def main():
+	parser = argparse.ArgumentParser(description="Rate limiter per check cost vs tracked keys")
+	parser.add_argument("--keys", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+	parser.add_argument("--checks", type=int, default=200_000)
+	parser.add_argument("--seed", type=int, default=1)
+	parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+	args = parser.parse_args()
+
+	print(f"{args.backend} backend, user + guild policy per check")
+	print(f"{'keys':>10}  {'ns/check':>9}  {'keys after':>10}")
+
+	with tempfile.TemporaryDirectory() as directory:
+		for keys in args.keys:
+			backend = make_backend(args.backend, directory)
+			per_check, remaining = bench(backend, keys, args.checks, args.seed)
+			backend.close()
+			print(f"{keys:>10}  {per_check:>9.0f}  {remaining:>10}")
+
+if __name__ == "__main__":
+	main()
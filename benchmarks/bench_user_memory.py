@@ -0,0 +1,66 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_memory import UserMemory
+
+# top-k retrieval latency as the store fills up, including one very chatty user who owns a big share of it
+# python benchmarks/bench_user_memory.py --facts 1000 20000 50000
+# python benchmarks/bench_user_memory.py --disk
+
+WORDS = (
+	"cat dog peanut nurse teacher student minecraft guitar piano coffee tea pizza sushi london paris tokyo night shift "
+	"anime manga football chess painting running gym cooking baking rust python java linux windows rain snow summer"
+).split()
+
+TEMPLATES = ["i'm a {} and i like {}", "my {} is called {}", "i love {} and {}", "i work with {} near {}", "i hate {} but i play {}"]
+
+def fact(rng: random.Random) -> str:
+	return rng.choice(TEMPLATES).format(rng.choice(WORDS), rng.choice(WORDS))
+
+def bench(facts: int, users: int, searches: int, directory, seed: int) -> tuple[float, float, float]:
+	rng = random.Random(seed)
+	memory = UserMemory(directory, capacity=facts)
+
+	started = time.perf_counter()
+	for _ in range(facts):
+		# a quarter of everything belongs to user 1, the rest is spread out
+		user = 1 if rng.random() < 0.25 else rng.randrange(2, users + 2)
+		memory.add(user, fact(rng), duplicate_similarity=2.0)
+	fill = (time.perf_counter() - started) / facts * 1e6
+
+	timings = []
+	for _ in range(searches):
+		user = 1 if rng.random() < 0.5 else rng.randrange(2, users + 2)
+		query = f"hey do you remember my {rng.choice(WORDS)} and {rng.choice(WORDS)}"
+
+		started = time.perf_counter()
+		memory.search(user, query)
+		timings.append(time.perf_counter() - started)
+
+	memory.close()
+	timings.sort()
+	return fill, timings[len(timings) // 2] * 1e6, timings[int(len(timings) * 0.99)] * 1e6
+
+def main():
+	parser = argparse.ArgumentParser(description="User memory retrieval latency vs stored facts")
+	parser.add_argument("--facts", type=int, nargs="+", default=[1_000, 20_000, 50_000])
+	parser.add_argument("--users", type=int, default=2_000)
+	parser.add_argument("--searches", type=int, default=2_000)
+	parser.add_argument("--disk", action="store_true", help="memory mapped files instead of in memory arrays")
+	parser.add_argument("--seed", type=int, default=1)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as directory:
+		print(f"{'facts':>8} {'add us':>8} {'p50 us':>8} {'p99 us':>8}")
+		for facts in args.facts:
+			fill, p50, p99 = bench(facts, args.users, args.searches, os.path.join(directory, str(facts)) if args.disk else None, args.seed)
+			print(f"{facts:>8} {fill:>8.1f} {p50:>8.1f} {p99:>8.1f}")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,89 @@
+import logging
+import time
+from collections import OrderedDict, deque
+from config import BOT_CONFIG
+from typing import Callable, Deque
+
+logger = logging.getLogger(__name__)
+
+class Exchange:
+	__slots__ = ("author", "prompt", "reply", "created_at")
+
+	def __init__(self, author: str, prompt: str, reply: str, created_at: float):
+		self.author = author
+		self.prompt = prompt
+		self.reply = reply
+		self.created_at = created_at
+
+	def render(self) -> str:
+		return f"{self.author}: {self.prompt}\nYou: {self.reply}"
+
+class ChatMemory:
+	# last few exchanges per channel (dms included), least recently active channels dropped first once the global cap is hit
+	# worst case is max_exchanges * (MAX_MESSAGE_LENGTH + reply_chars), no matter how many channels are active
+	def __init__(
+		self,
+		per_channel: int = BOT_CONFIG.CHAT_MEMORY_EXCHANGES,
+		max_exchanges: int = BOT_CONFIG.CHAT_MEMORY_MAX_EXCHANGES,
+		reply_chars: int = BOT_CONFIG.CHAT_MEMORY_REPLY_CHARS,
+		ttl: float = BOT_CONFIG.CHAT_MEMORY_TTL,
+		clock: Callable[[], float] = time.monotonic
+	):
+		self.per_channel = per_channel
+		self.max_exchanges = max_exchanges
+		self.reply_chars = reply_chars
+		self.ttl = ttl
+		self.clock = clock
+
+		self.channels: OrderedDict[int, Deque[Exchange]] = OrderedDict()
+		self.size = 0
+		self.evicted_channels = 0
+
+	def add(self, channel_id: int, author: str, prompt: str, reply: str):
+		exchanges = self.channels.get(channel_id)
+		if exchanges is None:
+			exchanges = self.channels[channel_id] = deque(maxlen=self.per_channel)
+		else:
+			self.channels.move_to_end(channel_id)
+
+		if len(exchanges) < self.per_channel:
+			self.size += 1
+
+		# the deque drops the channel's oldest exchange itself
+		exchanges.append(Exchange(author, prompt, " ".join(reply.split())[:self.reply_chars], self.clock()))
+
+		while self.size > self.max_exchanges:
+			_, dropped = self.channels.popitem(last=False)
+			self.size -= len(dropped)
+			self.evicted_channels += 1
+
+	def render(self, channel_id: int, max_chars: int = BOT_CONFIG.CHAT_MEMORY_CHARS) -> str:
+		exchanges = self.channels.get(channel_id)
+		if not exchanges:
+			return ""
+
+		oldest = self.clock() - self.ttl
+		lines = []
+		budget = max_chars
+
+		# newest first so they win the budget, then put back in order
+		for exchange in reversed(exchanges):
+			if exchange.created_at < oldest:
+				break
+
+			text = exchange.render()
+			if len(text) > budget:
+				break
+
+			budget -= len(text) + 1
+			lines.append(text)
+
+		lines.reverse()
+		return "\n".join(lines)
+
+	def get_stats(self) -> dict:
+		return {
+			"channels": len(self.channels),
+			"exchanges": self.size,
+			"evicted_channels": self.evicted_channels
+		}
@@ -0,0 +1,41 @@
+import io
+import logging
+import discord
+import ai_handler
+import http_client
+import json
+import rate_limiter
+from discord.ext import commands
+from discord import app_commands
+from config import BOT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class AICog(commands.Cog):
+	def __init__(self, bot):
+		self.bot = bot
+
+	@app_commands.command(name="ai-model", description="Get the current AI model being used by the bot")
+	async def ai_model_command(self, interaction: discord.Interaction):
+		await interaction.response.defer()
+
+		try:
+			async with http_client.get_session().get(BOT_CONFIG.API_URL) as response:
+				if response.status == 200:
+					model_info = await response.text()
+					await interaction.followup.send(model_info, ephemeral=True)
+				else:
+					await interaction.followup.send("couldn't fetch model T-T", ephemeral=True)
+		except Exception as e:
+			await interaction.followup.send("error fetching model T-T", ephemeral=True)
+			logger.warning(f"failed to fetch model: {e}")
+
+	@app_commands.command(name="ai-stats", description="Get runtime stats for the AI backend")
+	async def ai_stats_command(self, interaction: discord.Interaction):
+		bot = self.bot
+		stats = json.dumps({**ai_handler.get_stats(), "rate_limits": rate_limiter.get_stats(), "routes": bot.router.get_stats(), "message_cache": bot.message_cache.get_stats(), "chat_memory": bot.chat_memory.get_stats(), "user_memory": bot.user_memory.get_stats() if bot.user_memory else None, "semantic_cache": bot.semantic_cache.get_stats() if bot.semantic_cache else None}, indent=1)
+		# well past the 2000 character message limit once every section is in, so it goes as a file
+		await interaction.response.send_message(file=discord.File(io.BytesIO(stats.encode("utf-8")), filename="ai-stats.json"), ephemeral=True)
+
+async def setup(bot):
+	await bot.add_cog(AICog(bot))
@@ -2,11 +2,10 @@ import logging
 import ai_handler
 import json
 import random
-import re
 import config
 import discord
 import datetime
-import aiohttp
+import http_client
 from discord import app_commands
 from discord.ext import commands
 from typing import List
@@ -14,6 +13,38 @@ from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+GAME_691_TRIGGER = "r/691"
+
+GAME_691_SYSTEM_PROMPT = """
+A 691 game has been triggered by posting "r/691". Generate a JSON response with timeout duration and tsundere message.
+The 691 game: Users post "r/691" and get randomly timed out. Your job is to decide duration based on the quality of the user's message and create a tsundere anime girl response.
+
+Duration guidelines:
+- Most boring / low-effort posts: Shorter timeouts (only a few minutes or so)
+- Posts that are funny, creative or invoke chaos: Longer timeouts (a few hours?)
+- Absolute legendary posts / feeling mean: Very, very long timeouts (up to 24 hours)
+- Use variety! Don't always pick the same ranges or any arbitrary numbers
+- Duration in SECONDS only. I repeat, SECONDS, NOT HOURS, up to 86400 seconds.
+- Include tsundere personality (act annoyed but secretly caring)
+- MUST include "DURATION_PLACEHOLDER" in the tsundere_message (but DO NOT put seconds, minutes, hours, etc)
+- Can reference what they posted if you want
+- Make your own variations based off the response examples below if you want
+
+Tsundere response examples:
+- "Hmph! You asked for it, baka! Enjoy your DURATION_PLACEHOLDER timeout! 😤"
+- "I-It's not like I wanted to timeout you or anything! DURATION_PLACEHOLDER should teach you! 😤"
+- "S-Stupid! Did you really think you'd get away with that?! DURATION_PLACEHOLDER for you!"
+- "Ugh! Fine! Take your DURATION_PLACEHOLDER and think about what you've done, idiot!"
+- "D-Don't get the wrong idea! I'm only timing you out for DURATION_PLACEHOLDER because I have to!"
+- "You're so annoying! Here's your DURATION_PLACEHOLDER timeout! Maybe that'll teach you!"
+- "N-Not that I'm enjoying this... but DURATION_PLACEHOLDER timeout seems fitting, baka!"
+
+Respond with ONLY this JSON format (copy format EXACTLY):
+{"duration_seconds": <number between 1-86400>,"tsundere_message": "<Your message with DURATION_PLACEHOLDER where duration would normally go, under 128 characters>"}
+
+JSON only, no other text.
+"""
+
 # TODO: probably better to make this a separate module
 class Card:
 	def __init__(self, suit: str, rank: str, value: int):
@@ -495,6 +526,11 @@ class GamesCog(commands.Cog):
 
 		self.timeout_emojis = ["⏰", "🚪", "💥", "🔨", "⚡", "🎲", "💀", "🎯"]
 
+		self.bot.router.add_trigger(GAME_691_TRIGGER, self.handle_691, guild_only=True)
+
+	def cog_unload(self):
+		self.bot.router.remove_trigger(GAME_691_TRIGGER)
+
 	@app_commands.command(name="blackjack", description="Play a game of blackjack against Anya!")
 	async def blackjack_command(self, interaction: discord.Interaction):
 		try:
@@ -536,40 +572,10 @@ class GamesCog(commands.Cog):
 				return f"{hours}h {remaining_minutes}m"
 
 	async def get_ai_691_response(self, message: str) -> tuple[int, str]:
-		prompt = f"""
-A 691 game has been triggered by posting "r/691". Generate a JSON response with timeout duration and tsundere message.
-The 691 game: Users post "r/691" and get randomly timed out. Your job is to decide duration based on the quality of the message and create a tsundere anime girl response.
-
-Duration guidelines:
-- Most boring / low-effort posts: Shorter timeouts (only a few minutes or so)
-- Posts that are funny, creative or invoke chaos: Longer timeouts (a few hours?)
-- Absolute legendary posts / feeling mean: Very, very long timeouts (up to 24 hours)
-- Use variety! Don't always pick the same ranges or any arbitrary numbers
-- Duration in SECONDS only. I repeat, SECONDS, NOT HOURS, up to 86400 seconds.
-- Include tsundere personality (act annoyed but secretly caring)
-- MUST include "DURATION_PLACEHOLDER" in the tsundere_message (but DO NOT put seconds, minutes, hours, etc)
-- Can reference what they posted if you want
-- Make your own variations based off the response examples below if you want
-
-Message: {message}
-
-Tsundere response examples:
-- "Hmph! You asked for it, baka! Enjoy your DURATION_PLACEHOLDER timeout! 😤"
-- "I-It's not like I wanted to timeout you or anything! DURATION_PLACEHOLDER should teach you! 😤"
-- "S-Stupid! Did you really think you'd get away with that?! DURATION_PLACEHOLDER for you!"
-- "Ugh! Fine! Take your DURATION_PLACEHOLDER and think about what you've done, idiot!"
-- "D-Don't get the wrong idea! I'm only timing you out for DURATION_PLACEHOLDER because I have to!"
-- "You're so annoying! Here's your DURATION_PLACEHOLDER timeout! Maybe that'll teach you!"
-- "N-Not that I'm enjoying this... but DURATION_PLACEHOLDER timeout seems fitting, baka!"
-
-Respond with ONLY this JSON format (copy format EXACTLY):
-{{"duration_seconds": <number between 1-86400>,"tsundere_message": "<Your message with DURATION_PLACEHOLDER where duration would normally go, under 128 characters>"}}
-
-JSON only, no other text.
-"""
+		prompt = f"Message: {message}"
 
 		try:
-			response = await ai_handler.generate_ai_response(prompt)
+			response = await ai_handler.generate_ai_response(prompt, "691", profile="games_json", system_prompt=GAME_691_SYSTEM_PROMPT)
 			response = response.strip()
 
 			start_idx = response.find("{")
@@ -594,29 +600,18 @@ JSON only, no other text.
 
 			return duration, response_message
 
-	def is_691_trigger(self, content: str) -> bool:
-		pattern = r'^r/691'
-		return bool(re.match(pattern, content.strip(), re.IGNORECASE))
-
 	async def get_random_anime_image(self, url) -> str:
 		try:
-			async with aiohttp.ClientSession() as session:
-				async with session.get(url) as response:
-					if response.status == 200:
-						data = await response.json()
-						return data.get("url", "")
+			async with http_client.get_session().get(url) as response:
+				if response.status == 200:
+					data = await response.json()
+					return data.get("url", "")
 		except Exception as e:
 			logger.warning(f"Failed to get anime image: {e}")
 		return ""
 
-	@commands.Cog.listener()
-	async def on_message(self, message: discord.Message):
-		if message.author.bot or not message.guild:
-			return
-
-		if not self.is_691_trigger(message.content):
-			return
-
+	async def handle_691(self, message: discord.Message):
+		# only ever called by the router, for guild messages starting with r/691
 		member = message.author
 
 		if not config.GAMES_CONFIG.TIMEOUT_VISUAL:
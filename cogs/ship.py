@@ -10,6 +10,29 @@ from typing import List, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+SHIP_SYSTEM_PROMPT = """
+Analyse the compatibility between the two Discord users the user gives you and return ONLY a JSON response with this exact format:
+
+{
+	"percentage": <number between 0-100>,
+	"message": "<fun ship message based on the percentage>",
+	"ship_name": "<only ONE ship name, based on the two user's display name / username (whatever works best)>"
+}
+
+IMPORTANT: Be realistic and varied in your percentages. Don't be afraid to give lower scores, but also don't be afraid to give higher scores. If the context seems lacking, just make up a crazy number (0-100) - don't try and balance it with a midrange percentage!
+
+Guidelines for percentage:
+- 0-20%: Not compatible, different vibes
+- 21-40%: Some potential but challenges
+- 41-60%: Decent compatibility
+- 61-80%: Good match for each other
+- 81-100%: Perfect match, practically soulmates
+
+Make the message fun and playful. For high percentages, say they're meant to be. For low percentages, suggest they're better as friends. Keep it light-hearted and appropriate. You may use emoticons like :3, T-T, <3, </3, etc...
+
+Return ONLY the JSON, no other text. ONLY the JSON.
+"""
+
 class ShipCog(commands.Cog):
 	def __init__(self, bot):
 		self.bot = bot
@@ -59,16 +82,6 @@ class ShipCog(commands.Cog):
 
 	async def analyse_compatibility(self, user1_data: Dict, user2_data: Dict) -> Dict[str, Any]:
 		prompt = f"""
-Analyse the compatibility between these two Discord users and return ONLY a JSON response with this exact format:
-
-{{
-	"percentage": <number between 0-100>,
-	"message": "<fun ship message based on the percentage>",
-	"ship_name": "<only ONE ship name, based on the two user's display name / username (whatever works best)>"
-}}
-
-IMPORTANT: Be realistic and varied in your percentages. Don't be afraid to give lower scores, but also don't be afraid to give higher scores. If the context seems lacking, just make up a crazy number (0-100) - don't try and balance it with a midrange percentage!
-
 User 1 Info:
 - Username: {user1_data["info"]["username"]}
 - Display Name: {user1_data["info"]["display_name"]}
@@ -86,17 +99,6 @@ User 2 Info:
 - Roles: {user2_data["info"]["roles"]}
 - Status: {user2_data["info"]["status"]}
 - Activity: {user2_data["info"]["activity"]}
-
-Guidelines for percentage:
-- 0-20%: Not compatible, different vibes
-- 21-40%: Some potential but challenges
-- 41-60%: Decent compatibility
-- 61-80%: Good match for each other
-- 81-100%: Perfect match, practically soulmates
-
-Make the message fun and playful. For high percentages, say they're meant to be. For low percentages, suggest they're better as friends. Keep it light-hearted and appropriate. You may use emoticons like :3, T-T, <3, </3, etc...
-
-Return ONLY the JSON, no other text. ONLY the JSON.
 """
 
 		response = ""
@@ -105,7 +107,7 @@ Return ONLY the JSON, no other text. ONLY the JSON.
 
 		# i hate working with jsons
 		try:
-			response = await ai_handler.generate_ai_response(prompt)
+			response = await ai_handler.generate_ai_response(prompt, "ship", profile="games_json", system_prompt=SHIP_SYSTEM_PROMPT)
 			response = response.strip()
 
 			start_idx = response.find("{")
@@ -1,9 +1,25 @@
 import os
 from dataclasses import dataclass
 from dotenv import load_dotenv
+from typing import Optional
 
 load_dotenv()
 
+def parse_endpoints(value: str) -> list:
+	# "url|weight|API_KEY_ENV_VAR,url|weight" - weight and key are optional
+	endpoints = []
+
+	for entry in (value or "").split(","):
+		parts = [part.strip() for part in entry.split("|")]
+		if not parts[0]:
+			continue
+
+		weight = float(parts[1]) if len(parts) > 1 and parts[1] else 1.0
+		key_env = parts[2] if len(parts) > 2 and parts[2] else None
+		endpoints.append((parts[0], weight, key_env))
+
+	return endpoints
+
 @dataclass
 class BotConfig:
 	TOKEN: str = os.getenv("DISCORD_TOKEN") or ""
@@ -12,14 +28,210 @@ class BotConfig:
 	API_URL = os.getenv("API_URL") or "https://ai.hackclub.com/chat/completions"
 	API_KEY = None # n/a
 
+	# optional list of openai compatible endpoints to balance between, overrides API_URL for ai requests
+	API_ENDPOINTS = parse_endpoints(os.getenv("API_URLS")) or [(API_URL, 1.0, None)]
+
 	# rate limiting stuff
-	RATE_LIMIT_MESSAGES: int = 30
-	RATE_LIMIT_WINDOW: int = 60
 	RATE_LIMIT_MESSAGES_LOCAL: int = 10
 	RATE_LIMIT_WINDOW_LOCAL: int = 60
 
 	MAX_MESSAGE_LENGTH = 320
 
+	# recent messages kept in memory, so replies to anya are spotted (and their context built) without api calls
+	MESSAGE_CACHE_SIZE: int = 5000
+	BOT_MESSAGE_CACHE_SIZE: int = 5000 # ids only, anya's own messages stay recognisable long after their content is evicted
+	REPLY_CHAIN_DEPTH: int = 3
+	REPLY_CHAIN_CHARS: int = 600 # total for the quoted messages, nearest ones win
+
+	# short per channel (and per dm) memory for chat, so anya remembers what was just said
+	CHAT_MEMORY_EXCHANGES: int = 6 # per channel
+	CHAT_MEMORY_MAX_EXCHANGES: int = 20000 # across every channel, least recently active channels go first
+	CHAT_MEMORY_REPLY_CHARS: int = 400
+	CHAT_MEMORY_CHARS: int = 1200 # how much of it goes into the prompt, newest first
+	CHAT_MEMORY_TTL: float = 30 * 60 # older exchanges aren't brought up again
+
+	# text filter rule sets, one regex per line in <name>.txt
+	FILTER_RULES_DIR = os.getenv("FILTER_RULES_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "filters")
+
+@dataclass
+class HTTPConfig:
+	# one shared connection pool for every outbound request
+	POOL_LIMIT: int = 100
+	POOL_LIMIT_PER_HOST: int = 20
+	KEEPALIVE_TIMEOUT: float = 60.0
+	DNS_CACHE_TTL: int = 300
+
+	DEFAULT_TIMEOUT: float = 30.0
+	CONNECT_TIMEOUT: float = 5.0
+
+	WARMUP_CONNECTIONS: int = 2
+	WARMUP_TIMEOUT: float = 5.0
+
+@dataclass(frozen=True)
+class GenerationProfile:
+	max_tokens: Optional[int] = None
+	temperature: Optional[float] = None
+	stop: Optional[tuple] = None
+	model: Optional[str] = None # None = whatever the backend defaults to
+	reasoning_effort: Optional[str] = None # not sent when None
+
+# model overrides, e.g. a small fast model for the cheap classification style calls
+AI_MODEL = os.getenv("AI_MODEL") or None
+AI_MODEL_CHEAP = os.getenv("AI_MODEL_CHEAP") or AI_MODEL
+# sent as reasoning_effort, "none" turns thinking off on the default backend so the token caps below aren't eaten by <think> blocks
+# set it to an empty string to not send anything
+AI_REASONING_EFFORT = os.getenv("AI_REASONING_EFFORT", "none") or None
+
+@dataclass
+class AIConfig:
+	# streamed replies show up as soon as the first words arrive, then get edited as more come in
+	STREAMING_ENABLED: bool = True
+	STREAM_TIMEOUT: float = 60.0
+	STREAM_READ_TIMEOUT: float = 5.0
+	STREAM_EDIT_INTERVAL: float = 1.2 # discord allows ~5 edits per 5s per channel
+
+	# soft deadline - if nothing has come back after this many seconds, post a placeholder and edit it once the reply lands (0 = off)
+	SOFT_DEADLINE: float = 1.5
+	PLACEHOLDER_REPLIES = [
+		"hmm lemme think...",
+		"wait wait, thinking :3",
+		"one sec!!",
+		"ooh gimme a moment ?_?",
+		"*thinking very hard*"
+	]
+
+	# ask for the reply and the reaction emoji in one completion instead of two requests
+	COMBINED_REACTION: bool = True
+
+	# response cache - in memory lru, plus an optional sqlite file that survives restarts
+	CACHE_MAX_ENTRIES: int = 1024
+	CACHE_DB_PATH = os.getenv("AI_CACHE_DB") or None
+
+	# seconds to keep a cached response per call site, 0 = never cache
+	CACHE_TTLS = {
+		"chat": 0,
+		"roleplay": 0,
+		"emoji": 60 * 60,
+		"moderation": 60 * 60,
+		"ship": 24 * 60 * 60,
+		"691": 10 * 60
+	}
+
+	# semantic cache for chat - short messages that look alike ("hi anya", "hii anya :3", "hello anya") share replies
+	SEMANTIC_CACHE_ENABLED: bool = True
+	SEMANTIC_CACHE_MAX_ENTRIES: int = 512
+	SEMANTIC_CACHE_THRESHOLD: float = 0.95 # cosine similarity of character trigrams, only small talk is cached (semantic_cache.SMALL_TALK)
+	SEMANTIC_CACHE_VARIANTS: int = 3 # replies collected per entry before it's served, picked at random so it doesn't feel canned
+	SEMANTIC_CACHE_MAX_PROMPT_CHARS: int = 48 # anything longer probably needs a real answer
+	SEMANTIC_CACHE_DIMENSIONS: int = 256 # power of two, prompts are short
+
+	# dispatch scheduler - moderation > chat > roleplay > games > emoji
+	MAX_CONCURRENT_REQUESTS: int = 8 # starting point, adaptive concurrency moves it between the min and max below
+
+	ADAPTIVE_CONCURRENCY: bool = True
+	CONCURRENCY_MIN: int = 1
+	CONCURRENCY_MAX: int = 32
+	CONCURRENCY_TARGET_LATENCY: float = 3.0 # only grow while responses (or first tokens) come back faster than this
+	CONCURRENCY_INCREASE: float = 1.0
+	CONCURRENCY_DECREASE_FACTOR: float = 0.5 # applied on timeouts, 429s and 5xx
+	CONCURRENCY_DECREASE_COOLDOWN: float = 2.0
+
+	CALL_SITE_PRIORITIES = {
+		"moderation": "moderation",
+		"chat": "chat",
+		"roleplay": "roleplay",
+		"ship": "games",
+		"691": "games",
+		"emoji": "emoji"
+	}
+
+	# seconds a request may sit in the queue before it's given up on
+	QUEUE_DEADLINES = {
+		"moderation": 15.0,
+		"chat": 10.0,
+		"roleplay": 10.0,
+		"games": 6.0,
+		"emoji": 2.0
+	}
+
+	# once this many requests are queued, new requests at or below SHED_PRIORITY are dropped straight away
+	SHED_QUEUE_DEPTH: int = 16
+	SHED_PRIORITY: str = "games"
+	MAX_QUEUE_DEPTH: int = 64 # hard cap for every priority
+
+	# reactions are picked locally from the emoji index first, the model is only asked when nothing matches
+	REACTION_LLM_FALLBACK: bool = True
+	# reactions are added in the background after the reply, past this many in flight new ones are skipped
+	MAX_BACKGROUND_TASKS: int = 100
+
+	# emoji reactions from concurrent messages are collected for a moment and classified in one request
+	EMOJI_BATCH_ENABLED: bool = True
+	EMOJI_BATCH_WINDOW: float = 0.1
+	EMOJI_BATCH_MAX_ITEMS: int = 10
+	EMOJI_BATCH_ITEM_CHARS: int = 300
+
+	# retries / hedging / circuit breaker
+	REQUEST_TIMEOUT: float = 5.0
+	MAX_RETRIES: int = 2
+	RETRY_BASE_DELAY: float = 0.25
+	RETRY_MAX_DELAY: float = 2.0
+
+	HEDGE_ENABLED: bool = False # sends a duplicate request when the first one is slower than p95
+	HEDGE_MIN_SAMPLES: int = 20
+	HEDGE_MIN_DELAY: float = 0.3
+
+	BREAKER_WINDOW: int = 20
+	BREAKER_MIN_REQUESTS: int = 8
+	BREAKER_ERROR_RATE: float = 0.5
+	BREAKER_COOLDOWN: float = 30.0
+	BREAKER_OPEN_REPLY: str = "my brain is kinda fried rn T-T try again in a bit"
+
+	# per call site token caps, stop sequences, models etc.
+	GENERATION_PROFILES = {
+		"emoji": GenerationProfile(
+			max_tokens=16,
+			temperature=0.3,
+			stop=("\n",),
+			model=AI_MODEL_CHEAP,
+			reasoning_effort=AI_REASONING_EFFORT
+		),
+		"emoji_batch": GenerationProfile(
+			max_tokens=16, # per message in the batch
+			temperature=0.3,
+			model=AI_MODEL_CHEAP,
+			reasoning_effort=AI_REASONING_EFFORT
+		),
+		"moderation_json": GenerationProfile(
+			max_tokens=160,
+			temperature=0.0,
+			model=AI_MODEL_CHEAP,
+			reasoning_effort=AI_REASONING_EFFORT
+		),
+		"games_json": GenerationProfile(
+			max_tokens=200,
+			temperature=0.9,
+			model=AI_MODEL,
+			reasoning_effort=AI_REASONING_EFFORT
+		),
+		"chat_short": GenerationProfile(
+			max_tokens=400,
+			temperature=0.8,
+			model=AI_MODEL,
+			reasoning_effort=AI_REASONING_EFFORT
+		),
+		"roleplay": GenerationProfile(
+			max_tokens=1024,
+			temperature=0.9,
+			model=AI_MODEL,
+			reasoning_effort=AI_REASONING_EFFORT
+		)
+	}
+
+	# multi endpoint routing
+	ROUTER_EWMA_ALPHA: float = 0.2
+	ROUTER_EJECT_AFTER_FAILURES: int = 3
+	ROUTER_EJECT_SECONDS: float = 30.0
+
 @dataclass
 class RoleplayConfig:
 	MAX_SESSIONS_PER_USER: int = 1
@@ -43,6 +255,14 @@ class RoleplayConfig:
 	CONTEXT_WINDOW_SIZE: int = 10
 	MAX_AI_RESPONSE_LENGTH: int = 256
 
+	# generic enough to fit any character while the real reply is on its way
+	PLACEHOLDER_REPLIES = [
+		"*thinks for a moment...*",
+		"*pauses, considering what you said...*",
+		"*tilts head*...",
+		"*takes a deep breath...*"
+	]
+
 @dataclass
 class ModerationConfig:
 	MIN_CONFIDENCE_THRESHOLD: float = 0.5
@@ -58,7 +278,54 @@ class GamesConfig:
 
 	GAME_TIMEOUT: bool = 60.0
 
+@dataclass(frozen=True)
+class RatePolicy:
+	limit: int # requests allowed per window
+	window: float # seconds
+	burst: Optional[int] = None # how many can land back to back, defaults to limit
+
+@dataclass
+class RateLimitConfig:
+	# idle keys dropped per check, keeps memory bounded without ever sweeping everything at once
+	EVICT_PER_CHECK: int = 2
+
+	# point every bot process at the same sqlite file (RATE_LIMIT_DB in .env) to share limits between them
+	DB_PATH = os.getenv("RATE_LIMIT_DB") or None
+	DB_BUSY_TIMEOUT: float = 0.25
+
+	# named policies, the key (user id, guild id, "global"...) is picked by the caller
+	POLICIES = {
+		"ai_user": RatePolicy(BotConfig.RATE_LIMIT_MESSAGES_LOCAL, BotConfig.RATE_LIMIT_WINDOW_LOCAL),
+		"roleplay_create": RatePolicy(RoleplayConfig.MAX_SESSIONS_PER_DAY, 24 * 60 * 60),
+		"roleplay_message": RatePolicy(RoleplayConfig.MAX_MESSAGES_PER_WINDOW, RoleplayConfig.MESSAGE_RATE_WINDOW),
+		# fetch_message calls when a replied-to message isn't cached
+		"message_fetch": RatePolicy(20, 60)
+	}
+
+@dataclass
+class UserMemoryConfig:
+	# long term facts about regulars, pulled into the chat prompt when they look relevant
+	ENABLED: bool = True
+
+	# set USER_MEMORY_DIR in .env to keep them across restarts (memory mapped .npy files), otherwise they live in memory
+	DIR = os.getenv("USER_MEMORY_DIR") or None
+
+	CAPACITY: int = 20000 # facts across every user, the oldest get overwritten once full
+	DIMENSIONS: int = 512 # hashed word / bigram features per fact (file size is CAPACITY * DIMENSIONS * 4 bytes)
+	MAX_FACT_BYTES: int = 256
+	MAX_PER_USER: int = 64 # past this a user's oldest fact makes room, also keeps every search small
+	MAX_PER_MESSAGE: int = 2
+
+	TOP_K: int = 3
+	MIN_SIMILARITY: float = 0.2
+	DUPLICATE_SIMILARITY: float = 0.85 # a new fact this close to an old one replaces it instead
+	PROMPT_CHARS: int = 300 # hard cap for what goes into the prompt
+
 BOT_CONFIG = BotConfig()
+HTTP_CONFIG = HTTPConfig()
+AI_CONFIG = AIConfig()
 ROLEPLAY_CONFIG = RoleplayConfig()
 MODERATION_CONFIG = ModerationConfig()
 GAMES_CONFIG = GamesConfig()
+RATE_LIMIT_CONFIG = RateLimitConfig()
+USER_MEMORY_CONFIG = UserMemoryConfig()
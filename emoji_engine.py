@@ -0,0 +1,274 @@
+import logging
+import os
+import re
+import sys
+from typing import Optional, Dict
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "emoji.txt")
+
+VARIATION_SELECTOR = "\ufe0f"
+SKIN_TONES = {chr(codepoint) for codepoint in range(0x1F3FB, 0x1F400)}
+
+# curated first, these outweigh anything matched by emoji name
+# no everyday function words ("no", "ok", "why"...) - they turn up in messages that mean something else entirely
+KEYWORD_REACTIONS = {
+	"lol": "😂",
+	"lmao": "😂",
+	"lmfao": "😂",
+	"haha": "😂",
+	"hahaha": "😂",
+	"rofl": "🤣",
+	"xd": "😆",
+	"dead": "💀",
+	"skull": "💀",
+	"love": "❤️",
+	"<3": "❤️",
+	"cute": "🥺",
+	"thanks": "🙏",
+	"thank": "🙏",
+	"ty": "🙏",
+	"thx": "🙏",
+	"sorry": "🥺",
+	"congrats": "🎉",
+	"congratulations": "🎉",
+	"birthday": "🎂",
+	"bday": "🎂",
+	"party": "🎉",
+	"hello": "👋",
+	"hii": "👋",
+	"bye": "👋",
+	"goodnight": "😴",
+	"gn": "😴",
+	"sleep": "😴",
+	"tired": "😴",
+	"hungry": "🍽️",
+	"food": "🍽️",
+	"fire": "🔥",
+	"lit": "🔥",
+	"sus": "🤨",
+	"hmm": "🤔",
+	"hmmm": "🤔",
+	"wow": "😮",
+	"omg": "😱",
+	"scary": "😱",
+	"angry": "😡",
+	"mad": "😤",
+	"ugh": "😤",
+	"baka": "😤",
+	"sad": "😢",
+	"cry": "😭",
+	"crying": "😭",
+	"t-t": "😭",
+	"yay": "🥳",
+	"gg": "🏆",
+	"cool": "😎",
+	"nice": "👍",
+	"cat": "🐱",
+	"dog": "🐶",
+	"peanut": "🥜",
+	"peanuts": "🥜",
+	"spy": "🕵️",
+	"music": "🎵",
+	"game": "🎮",
+	"gaming": "🎮",
+	"coffee": "☕",
+	"money": "💰",
+	"rain": "🌧️",
+	"sun": "☀️",
+	"snow": "❄️",
+	"eyes": "👀",
+	":3": "😺",
+	":)": "😊",
+	":d": "😄",
+	":(": "😢",
+	":p": "😛",
+	";)": "😉",
+	"uwu": "🥺",
+	"owo": "👀"
+}
+
+# concrete nouns looked up by their emoji name, anything else ("person", "hand", "face") matches far too much
+NAMED_NOUNS = {
+	"pizza", "hamburger", "taco", "burrito", "sushi", "bread", "cookie", "cupcake", "doughnut", "croissant", "bacon", "egg",
+	"banana", "grapes", "lemon", "peach", "pineapple", "strawberry", "watermelon", "avocado", "carrot", "potato", "popcorn",
+	"candy", "lollipop", "cat", "dog", "rabbit", "fox", "bear", "panda", "koala", "tiger", "lion", "horse", "unicorn", "cow",
+	"hamster", "frog", "monkey", "chicken", "penguin", "duck", "owl", "dolphin", "whale", "shark", "octopus", "snail",
+	"butterfly", "spider", "snake", "turtle", "dragon", "rose", "sunflower", "tulip", "cactus", "mushroom", "rainbow", "snowman",
+	"umbrella", "ghost", "robot", "alien", "guitar", "violin", "trumpet", "drum", "microphone", "headphone", "camera", "laptop",
+	"rocket", "airplane", "bicycle", "castle", "trophy", "crown", "balloon", "basketball", "baseball", "tennis", "bowling",
+	"volleyball", "kite"
+}
+
+# matches are scored rather than first one wins, so one stray word can't override what the rest of the message says
+KEYWORD_WEIGHT = 2
+NOUN_WEIGHT = 1
+
+# small sentiment lexicon for when no keyword matches
+POSITIVE_WORDS = {
+	"good", "great", "awesome", "amazing", "happy", "glad", "fun", "best", "beautiful", "perfect",
+	"excited", "yay", "lovely", "sweet", "fantastic", "wonderful", "proud", "enjoy"
+}
+NEGATIVE_WORDS = {
+	"bad", "awful", "terrible", "hate", "worst", "sick", "hurt", "lonely", "upset", "annoying",
+	"depressed", "stressed", "broke", "lost", "fail", "failed", "pain", "ugly", "boring"
+}
+NEGATIONS = {"not", "no", "never", "dont", "don't", "isnt", "isn't", "wasnt", "wasn't", "cant", "can't"}
+
+SENTIMENT_REACTIONS = {
+	"positive": "😊",
+	"negative": "🫂"
+}
+
+TOKEN_PATTERN = re.compile(r"<3|[:;][\w()]|t-t|[\w']+", re.IGNORECASE)
+
+class EmojiIndex:
+	def __init__(self, emojis: Dict[str, str]):
+		# emoji -> cldr name, fully qualified only
+		self.names = emojis
+		self._canonical: Dict[str, str] = {}
+		self._by_word: Dict[str, str] = {}
+
+		for emoji, name in emojis.items():
+			self._canonical[emoji] = emoji
+			# models and people often drop the variation selector (❤ vs ❤️), discord wants the fully qualified one
+			self._canonical.setdefault(emoji.replace(VARIATION_SELECTOR, ""), emoji)
+
+			if " " not in name and not SKIN_TONES.intersection(emoji):
+				self._by_word.setdefault(name.lower(), emoji)
+
+	@classmethod
+	def load(cls, path: str = INDEX_PATH) -> "EmojiIndex":
+		emojis = {}
+
+		with open(path, encoding="utf-8") as file:
+			for line in file:
+				if not line.strip() or line.startswith("#"):
+					continue
+
+				emoji, name = line.rstrip("\n").split("\t", 1)
+				emojis[emoji] = name
+
+		return cls(emojis)
+
+	def __len__(self) -> int:
+		return len(self.names)
+
+	def __contains__(self, value: str) -> bool:
+		return value in self._canonical
+
+	def normalise(self, value: Optional[str]) -> Optional[str]:
+		# valid emoji -> the form discord accepts, anything else -> None
+		if not value:
+			return None
+
+		return self._canonical.get(value.strip().strip("`'\"*").strip())
+
+	def for_word(self, word: str) -> Optional[str]:
+		return self._by_word.get(word) or (self._by_word.get(word[:-1]) if word.endswith("s") else None)
+
+class ReactionEngine:
+	def __init__(self, index: EmojiIndex):
+		self.index = index
+
+		# checked once here so a typo in the tables can never reach add_reaction
+		self.keywords = {}
+		for keyword, emoji in KEYWORD_REACTIONS.items():
+			normalised = index.normalise(emoji)
+			if normalised:
+				self.keywords[keyword] = normalised
+			else:
+				logger.warning(f"ignoring keyword reaction {keyword!r}, {emoji!r} is not a valid emoji")
+
+		self.nouns = {}
+		for noun in NAMED_NOUNS:
+			emoji = index.for_word(noun)
+			if emoji:
+				self.nouns[noun] = emoji
+			else:
+				logger.warning(f"ignoring named noun {noun!r}, no emoji is called that")
+
+		self.sentiment = {label: index.normalise(emoji) for label, emoji in SENTIMENT_REACTIONS.items()}
+
+	def classify(self, text: str) -> Optional[str]:
+		tokens = TOKEN_PATTERN.findall(text.lower())
+		if not tokens:
+			return None
+
+		# emoji -> [score, first position], ties go to whichever came up first
+		votes = {}
+		for position, token in enumerate(tokens):
+			emoji = self.keywords.get(token)
+			weight = KEYWORD_WEIGHT
+			if not emoji:
+				emoji = self.nouns.get(token) or (self.nouns.get(token[:-1]) if token.endswith("s") else None)
+				weight = NOUN_WEIGHT
+
+			if emoji:
+				votes.setdefault(emoji, [0, position])[0] += weight
+
+		if votes:
+			return min(votes.items(), key=lambda vote: (-vote[1][0], vote[1][1]))[0]
+
+		score = 0
+		for position, token in enumerate(tokens):
+			polarity = (token in POSITIVE_WORDS) - (token in NEGATIVE_WORDS)
+			if polarity and position and tokens[position - 1] in NEGATIONS:
+				polarity = -polarity
+			score += polarity
+
+		if score > 0:
+			return self.sentiment["positive"]
+		if score < 0:
+			return self.sentiment["negative"]
+
+		return None
+
+def build_index(source: str, dest: str = INDEX_PATH):
+	# source is unicode's emoji-test.txt (https://unicode.org/Public/emoji/latest/emoji-test.txt)
+	version = "unknown"
+	rows = []
+
+	with open(source, encoding="utf-8") as file:
+		for line in file:
+			if line.startswith("# Version:"):
+				version = line.split(":", 1)[1].strip()
+				continue
+
+			if "; fully-qualified" not in line:
+				continue
+
+			codepoints, comment = line.split("#", 1)
+			emoji = "".join(chr(int(codepoint, 16)) for codepoint in codepoints.split(";")[0].split())
+			# comment looks like "😀 E1.0 grinning face"
+			name = comment.strip().split(" ", 2)[2]
+			rows.append(f"{emoji}\t{name}")
+
+	os.makedirs(os.path.dirname(dest), exist_ok=True)
+	with open(dest, "w", encoding="utf-8") as file:
+		file.write(f"# fully qualified emoji from unicode emoji-test.txt, version {version}\n")
+		file.write("# regenerate with: python emoji_engine.py path/to/emoji-test.txt\n")
+		file.write("\n".join(rows) + "\n")
+
+	print(f"wrote {len(rows)} emoji to {dest}")
+
+_engine: Optional[ReactionEngine] = None
+
+def get_engine() -> ReactionEngine:
+	# loaded on first use, so building the index doesn't need an index
+	global _engine
+	if _engine is None:
+		_engine = ReactionEngine(EmojiIndex.load())
+		logger.info(f"loaded {len(_engine.index)} emoji")
+
+	return _engine
+
+def pick_reaction(text: str) -> Optional[str]:
+	return get_engine().classify(text)
+
+def normalise(value: Optional[str]) -> Optional[str]:
+	return get_engine().index.normalise(value)
+
+if __name__ == "__main__":
+	build_index(sys.argv[1])
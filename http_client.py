@@ -0,0 +1,75 @@
+import aiohttp
+import asyncio
+import logging
+from config import HTTP_CONFIG
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class HTTPClient:
+	def __init__(self):
+		self.session: Optional[aiohttp.ClientSession] = None
+
+	def _create_session(self) -> aiohttp.ClientSession:
+		connector = aiohttp.TCPConnector(
+			limit=HTTP_CONFIG.POOL_LIMIT,
+			limit_per_host=HTTP_CONFIG.POOL_LIMIT_PER_HOST,
+			keepalive_timeout=HTTP_CONFIG.KEEPALIVE_TIMEOUT,
+			ttl_dns_cache=HTTP_CONFIG.DNS_CACHE_TTL,
+			enable_cleanup_closed=True
+		)
+
+		return aiohttp.ClientSession(
+			connector=connector,
+			timeout=aiohttp.ClientTimeout(
+				total=HTTP_CONFIG.DEFAULT_TIMEOUT,
+				connect=HTTP_CONFIG.CONNECT_TIMEOUT
+			)
+		)
+
+	async def start(self):
+		if not self.session or self.session.closed:
+			self.session = self._create_session()
+
+	def get_session(self) -> aiohttp.ClientSession:
+		# lazy fallback for anything running outside the bot (scripts etc.)
+		if not self.session or self.session.closed:
+			self.session = self._create_session()
+
+		return self.session
+
+	async def _warm_one(self, url: str):
+		try:
+			async with self.get_session().get(
+				url,
+				timeout=aiohttp.ClientTimeout(total=HTTP_CONFIG.WARMUP_TIMEOUT)
+			) as response:
+				# read the body so the connection goes back to the pool
+				await response.read()
+		except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+			logger.debug(f"warmup for {url} failed: {e}")
+
+	async def warm(self, url: str, connections: int = HTTP_CONFIG.WARMUP_CONNECTIONS):
+		# opens a handful of connections up front so the first few ai calls skip the tcp + tls handshake
+		await asyncio.gather(*(self._warm_one(url) for _ in range(connections)))
+		logger.info(f"warmed {connections} connection(s) to {url}")
+
+	async def close(self):
+		if self.session and not self.session.closed:
+			await self.session.close()
+
+		self.session = None
+
+_http_client = HTTPClient()
+
+def get_session() -> aiohttp.ClientSession:
+	return _http_client.get_session()
+
+async def start():
+	await _http_client.start()
+
+async def warm(url: str, connections: int = HTTP_CONFIG.WARMUP_CONNECTIONS):
+	await _http_client.warm(url, connections)
+
+async def close():
+	await _http_client.close()
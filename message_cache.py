@@ -0,0 +1,157 @@
+import logging
+import discord
+import rate_limiter
+from collections import OrderedDict
+from config import BOT_CONFIG
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+def reply_reference_id(message: discord.Message) -> Optional[int]:
+	# forwards and references into other channels aren't replies, and fetching them from this channel only ever 404s
+	reference = message.reference
+	if not reference or reference.type is discord.MessageReferenceType.forward or reference.channel_id != message.channel.id:
+		return None
+
+	return reference.message_id
+
+class CachedMessage:
+	__slots__ = ("id", "channel_id", "author_id", "author_name", "content", "reference_id")
+
+	def __init__(self, message: discord.Message):
+		self.id = message.id
+		self.channel_id = message.channel.id
+		self.author_id = message.author.id
+		self.author_name = message.author.display_name or message.author.name
+		self.content = self._text(message)
+		self.reference_id = reply_reference_id(message)
+
+	@staticmethod
+	def _text(message: discord.Message) -> str:
+		# roleplay and 691 replies are embeds with no content
+		content = message.content or (message.embeds[0].description if message.embeds else None) or ""
+		return content[:BOT_CONFIG.REPLY_CHAIN_CHARS]
+
+class MessageCache:
+	def __init__(self, max_messages: int = BOT_CONFIG.MESSAGE_CACHE_SIZE, max_bot_messages: int = BOT_CONFIG.BOT_MESSAGE_CACHE_SIZE):
+		self.max_messages = max_messages
+		self.max_bot_messages = max_bot_messages
+
+		self.messages: OrderedDict[int, CachedMessage] = OrderedDict()
+		self.bot_message_ids: OrderedDict[int, None] = OrderedDict()
+
+		self.hits = 0
+		self.misses = 0
+		self.fetches = 0
+		self.fetches_limited = 0
+
+	def remember(self, message: discord.Message, bot_user: Optional[discord.abc.User]) -> CachedMessage:
+		cached = CachedMessage(message)
+
+		self.messages[cached.id] = cached
+		self.messages.move_to_end(cached.id)
+		if len(self.messages) > self.max_messages:
+			self.messages.popitem(last=False)
+
+		if bot_user and cached.author_id == bot_user.id:
+			self.bot_message_ids[cached.id] = None
+			if len(self.bot_message_ids) > self.max_bot_messages:
+				self.bot_message_ids.popitem(last=False)
+
+		return cached
+
+	def update(self, message: discord.Message):
+		# edits (streamed replies, placeholders being replaced) - only for messages we already have
+		cached = self.messages.get(message.id)
+		if cached:
+			cached.content = CachedMessage._text(message)
+
+	def get(self, message_id: int) -> Optional[CachedMessage]:
+		cached = self.messages.get(message_id)
+		if cached:
+			self.hits += 1
+		else:
+			self.misses += 1
+
+		return cached
+
+	def is_reply_to_bot(self, message: discord.Message, bot_user: discord.abc.User) -> Optional[bool]:
+		# None means we can't tell without fetching the replied-to message
+		reference_id = reply_reference_id(message)
+		if not reference_id:
+			return False
+
+		if reference_id in self.bot_message_ids:
+			return True
+
+		resolved = message.reference.resolved
+		if isinstance(resolved, discord.Message):
+			return resolved.author.id == bot_user.id
+		if resolved is not None or reference_id in self.messages:
+			# deleted, or cached and not ours
+			return False
+
+		return None
+
+	async def resolve_reply_to_bot(self, message: discord.Message, bot_user: discord.abc.User) -> bool:
+		replied = await self.fetch(message.channel, message.reference.message_id, bot_user)
+		return bool(replied) and replied.author_id == bot_user.id
+
+	async def fetch(self, channel: discord.abc.Messageable, message_id: int, bot_user: Optional[discord.abc.User] = None) -> Optional[CachedMessage]:
+		allowed, _ = await rate_limiter.check("message_fetch", "global")
+		if not allowed:
+			self.fetches_limited += 1
+			return None
+
+		self.fetches += 1
+		try:
+			message = await channel.fetch_message(message_id)
+		except discord.HTTPException as e:
+			logger.info(f"couldn't fetch replied-to message {message_id}: {e}")
+			return None
+
+		return self.remember(message, bot_user)
+
+	async def reply_chain(
+		self,
+		message: discord.Message,
+		bot_user: Optional[discord.abc.User],
+		depth: int = BOT_CONFIG.REPLY_CHAIN_DEPTH,
+		max_chars: int = BOT_CONFIG.REPLY_CHAIN_CHARS
+	) -> List[CachedMessage]:
+		# the messages this one replies to, oldest first, nearest first when it comes to the character budget
+		chain = []
+		budget = max_chars
+
+		reference_id = reply_reference_id(message)
+
+		# the gateway usually hands us the direct parent already
+		if reference_id and isinstance(message.reference.resolved, discord.Message) and reference_id not in self.messages:
+			self.remember(message.reference.resolved, bot_user)
+
+		while reference_id and len(chain) < depth:
+			cached = self.get(reference_id)
+			if not cached:
+				cached = await self.fetch(message.channel, reference_id, bot_user)
+				if not cached:
+					break
+
+			if len(cached.content) > budget:
+				break
+
+			budget -= len(cached.content)
+			chain.append(cached)
+			reference_id = cached.reference_id
+
+		chain.reverse()
+		return chain
+
+	def get_stats(self) -> dict:
+		return {
+			"messages": len(self.messages),
+			"bot_messages": len(self.bot_message_ids),
+			"hits": self.hits,
+			"misses": self.misses,
+			"fetches": self.fetches,
+			"fetches_limited": self.fetches_limited
+		}
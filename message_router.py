@@ -0,0 +1,143 @@
+import logging
+import discord
+from message_cache import MessageCache, reply_reference_id
+from typing import Any, Awaitable, Callable, Container, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[discord.Message], Awaitable[Any]]
+
+class PrefixTrie:
+	# case insensitive, the longest registered prefix wins
+	def __init__(self):
+		self.root: Dict[str, dict] = {}
+		self.depth = 0
+
+	def add(self, prefix: str, value: Any):
+		node = self.root
+		for char in prefix.lower():
+			node = node.setdefault(char, {})
+
+		node[None] = value
+		self.depth = max(self.depth, len(prefix))
+
+	def remove(self, prefix: str):
+		node = self.root
+		path = []
+		for char in prefix.lower():
+			if char not in node:
+				return
+			path.append((node, char))
+			node = node[char]
+
+		node.pop(None, None)
+
+		# prune the branch back up to the first node something else still needs
+		for parent, char in reversed(path):
+			if parent[char]:
+				break
+			del parent[char]
+
+	def match(self, text: str) -> Optional[Any]:
+		node = self.root
+		found = None
+
+		for char in text[:self.depth]:
+			node = node.get(char.lower())
+			if node is None:
+				break
+			if None in node:
+				found = node[None]
+
+		return found
+
+class MessageRouter:
+	# classifies every message once and hands it to the one handler that wants it
+	# order: bot authors (dropped) -> claimed channels (roleplay threads) -> trigger prefixes -> chat (dm, mention, reply to the bot)
+	ROUTES = ("bot", "channel", "trigger", "chat", "ignored")
+
+	def __init__(self, bot: discord.Client, replies: Optional[MessageCache] = None):
+		self.bot = bot
+		self.replies = replies
+		self.triggers = PrefixTrie()
+		self.claims: List[Tuple[Container[int], Handler]] = []
+		self.chat_handler: Optional[Handler] = None
+
+		self.counts = dict.fromkeys(self.ROUTES, 0)
+
+	def add_trigger(self, prefix: str, handler: Handler, guild_only: bool = False):
+		self.triggers.add(prefix, (handler, guild_only))
+
+	def remove_trigger(self, prefix: str):
+		self.triggers.remove(prefix)
+
+	def claim_channels(self, channel_ids: Container[int], handler: Handler):
+		# channel_ids is kept by reference (e.g. a cog's session dict), so it never needs re-registering as it changes
+		self.claims.append((channel_ids, handler))
+
+	def release_channels(self, channel_ids: Container[int]):
+		self.claims = [(claimed, handler) for claimed, handler in self.claims if claimed is not channel_ids]
+
+	def set_chat_handler(self, handler: Optional[Handler]):
+		self.chat_handler = handler
+
+	def classify(self, message: discord.Message) -> Tuple[str, Optional[Handler]]:
+		if message.author.bot:
+			return "bot", None
+
+		channel_id = message.channel.id
+		for channel_ids, handler in self.claims:
+			if channel_id in channel_ids:
+				return "channel", handler
+
+		content = message.content
+		if content and self.triggers.root:
+			trigger = self.triggers.match(content.lstrip())
+			if trigger and (message.guild or not trigger[1]):
+				return "trigger", trigger[0]
+
+		if self.chat_handler:
+			wants_chat = self._wants_chat(message)
+			if wants_chat:
+				return "chat", self.chat_handler
+			if wants_chat is None:
+				return "unresolved", self.chat_handler
+
+		return "ignored", None
+
+	def _wants_chat(self, message: discord.Message) -> Optional[bool]:
+		# None = a reply to something we don't have, only a fetch can tell if it was anya's
+		if not message.guild:
+			return True
+
+		user = self.bot.user
+		if not user:
+			return False
+
+		if any(mention.id == user.id for mention in message.mentions):
+			return True
+
+		if self.replies:
+			return self.replies.is_reply_to_bot(message, user)
+
+		reference = message.reference
+		if reply_reference_id(message) and isinstance(reference.resolved, discord.Message):
+			return reference.resolved.author.id == user.id
+
+		return False
+
+	async def dispatch(self, message: discord.Message):
+		route, handler = self.classify(message)
+
+		if route == "unresolved":
+			# the one case that costs an api call, and it's rate limited
+			route = "chat" if await self.replies.resolve_reply_to_bot(message, self.bot.user) else "ignored"
+			handler = self.chat_handler if route == "chat" else None
+
+		self.counts[route] += 1
+
+		if handler:
+			await handler(message)
+
+	def get_stats(self) -> dict:
+		return dict(self.counts)
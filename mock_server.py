@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from aiohttp import web
+
+# stand-in for an openai compatible /chat/completions backend so anya can be benchmarked offline
+# point API_URL at http://127.0.0.1:8000/chat/completions and go wild
+
+logger = logging.getLogger(__name__)
+
+CHAT_REPLIES = [
+	"hii :3 what's up?",
+	"hmm idk, sounds kinda sus to me ?_?",
+	"omg yes!! <3",
+	"that's a lot of words for a tuesday T-T",
+	"lol fair enough :p"
+]
+
+ROLEPLAY_REPLIES = [
+	"*tilts head* oh? tell me more about that...",
+	"*laughs softly* you really are something else, you know that?",
+	"*crosses arms* hmph, fine. I'll allow it. This time."
+]
+
+EMOJIS = ["😊", "😂", "🥺", "👀", "🔥", "💀", "✨", "😤"]
+
+TSUNDERE_MESSAGES = [
+	"Hmph! You asked for it, baka! Enjoy your DURATION_PLACEHOLDER timeout! 😤",
+	"I-It's not like I wanted to timeout you or anything! DURATION_PLACEHOLDER should teach you!",
+	"Ugh! Fine! Take your DURATION_PLACEHOLDER and think about what you've done, idiot!"
+]
+
+MODERATION_ACTIONS = {
+	"unban": "unban",
+	"pardon": "unban",
+	"untimeout": "untimeout",
+	"unmute": "untimeout",
+	"ban": "ban",
+	"kick": "kick",
+	"timeout": "timeout",
+	"mute": "timeout",
+	"shush": "timeout"
+}
+
+class MockLLM:
+	def __init__(self, args: argparse.Namespace):
+		self.args = args
+		self.random = random.Random(args.seed)
+		self.stats = {
+			"requests": 0,
+			"streamed": 0,
+			"errors": 0,
+			"timeouts": 0
+		}
+
+	def sample_latency(self) -> float:
+		mean = self.args.latency_ms / 1000
+		jitter = self.args.jitter_ms / 1000
+
+		if self.args.latency == "uniform":
+			latency = self.random.uniform(mean - jitter, mean + jitter)
+		elif self.args.latency == "normal":
+			latency = self.random.gauss(mean, jitter)
+		elif self.args.latency == "lognormal":
+			# long tail, closer to what real backends do
+			latency = mean * self.random.lognormvariate(0, jitter / mean if mean else 0)
+		else:
+			latency = mean
+
+		return max(0.0, latency)
+
+	def _moderation(self, prompt: str) -> str:
+		message = prompt.rsplit("Message to parse:", 1)[-1].lower()
+		action = next((value for key, value in MODERATION_ACTIONS.items() if key in message), "ban")
+		mention = re.search(r'<@!?\d+>', message)
+
+		return json.dumps({
+			"action": action,
+			"target_mention": mention.group(0) if mention else None,
+			"reason": "being mean",
+			"duration": 10 if action == "timeout" else None,
+			"confidence": round(self.random.uniform(0.6, 0.95), 2)
+		})
+
+	def _ship(self) -> str:
+		return json.dumps({
+			"percentage": self.random.randint(0, 100),
+			"message": "the stars have spoken :3",
+			"ship_name": "Mockship"
+		})
+
+	def _691(self) -> str:
+		return json.dumps({
+			"duration_seconds": self.random.randint(60, 7200),
+			"tsundere_message": self.random.choice(TSUNDERE_MESSAGES)
+		})
+
+	def _numbered_emojis(self, prompt: str) -> str:
+		count = len(re.findall(r'^\s*\d+[.)]', prompt.rsplit("Messages:", 1)[-1], re.MULTILINE))
+		return "\n".join(f"{index}. {self.random.choice(EMOJIS + ['none'])}" for index in range(1, count + 1))
+
+	def content_for(self, messages: list) -> str:
+		prompt = "\n".join(str(message.get("content", "")) for message in messages)
+		lowered = prompt.lower()
+
+		if "moderation request" in lowered:
+			content = self._moderation(prompt)
+		elif "compatibility" in lowered:
+			content = self._ship()
+		elif "r/691" in lowered:
+			content = self._691()
+		elif "numbered list" in lowered and "emoji" in lowered:
+			content = self._numbered_emojis(prompt)
+		elif "unicode emoji" in lowered and "REACTION:" not in prompt:
+			content = self.random.choice(EMOJIS + ["none"])
+		elif "respond as" in lowered or "stay completely in character" in lowered:
+			content = self.random.choice(ROLEPLAY_REPLIES)
+		else:
+			content = self.random.choice(CHAT_REPLIES)
+
+		if "REACTION:" in prompt:
+			content = f"REACTION: {self.random.choice(EMOJIS + ['none'])}\n{content}"
+
+		if self.args.think:
+			content = f"<think>\nOkay, the user wants a response. Let me think about this carefully...\n</think>\n{content}"
+
+		return content
+
+	async def _maybe_fail(self):
+		if self.random.random() < self.args.timeout_rate:
+			self.stats["timeouts"] += 1
+			# long enough that the client gives up first
+			await asyncio.sleep(self.args.timeout_seconds)
+
+		if self.random.random() < self.args.error_rate:
+			self.stats["errors"] += 1
+			error = web.HTTPServiceUnavailable if self.args.error_status == 503 else web.HTTPInternalServerError
+			raise error(reason="injected error")
+
+	@staticmethod
+	def completion(content: str, model: str) -> dict:
+		return {
+			"id": f"mock-{time.time_ns()}",
+			"object": "chat.completion",
+			"created": int(time.time()),
+			"model": model,
+			"choices": [
+				{
+					"index": 0,
+					"message": {
+						"role": "assistant",
+						"content": content
+					},
+					"finish_reason": "stop"
+				}
+			]
+		}
+
+	@staticmethod
+	def chunk(content: str, model: str) -> bytes:
+		payload = {
+			"object": "chat.completion.chunk",
+			"model": model,
+			"choices": [
+				{
+					"index": 0,
+					"delta": {
+						"content": content
+					}
+				}
+			]
+		}
+
+		return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+	async def handle_completion(self, request: web.Request) -> web.StreamResponse:
+		self.stats["requests"] += 1
+		body = await request.json()
+
+		await self._maybe_fail()
+
+		content = self.content_for(body.get("messages", []))
+		model = body.get("model") or self.args.model
+
+		if not body.get("stream"):
+			await asyncio.sleep(self.sample_latency())
+			return web.json_response(self.completion(content, model))
+
+		self.stats["streamed"] += 1
+
+		response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+		await response.prepare(request)
+
+		# latency = time to first token, then chunks trickle in
+		await asyncio.sleep(self.sample_latency())
+
+		for piece in re.findall(r'\S+\s*|\s+', content):
+			await response.write(self.chunk(piece, model))
+			await asyncio.sleep(self.args.chunk_ms / 1000)
+
+		await response.write(b"data: [DONE]\n\n")
+		await response.write_eof()
+
+		return response
+
+	async def handle_model(self, request: web.Request) -> web.Response:
+		return web.Response(text=self.args.model)
+
+	async def handle_stats(self, request: web.Request) -> web.Response:
+		return web.json_response(self.stats)
+
+def build_app(args: argparse.Namespace) -> web.Application:
+	mock = MockLLM(args)
+
+	app = web.Application()
+	app.router.add_post("/chat/completions", mock.handle_completion)
+	app.router.add_post("/v1/chat/completions", mock.handle_completion)
+	app.router.add_get("/chat/completions", mock.handle_model)
+	app.router.add_get("/v1/chat/completions", mock.handle_model)
+	app.router.add_get("/stats", mock.handle_stats)
+
+	return app
+
+def parse_args(argv=None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Mock OpenAI compatible LLM server for offline testing")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8000)
+	parser.add_argument("--model", default="mock-llm")
+	parser.add_argument("--seed", type=int, default=None)
+
+	parser.add_argument("--latency", choices=["fixed", "uniform", "normal", "lognormal"], default="fixed")
+	parser.add_argument("--latency-ms", type=float, default=300.0, help="mean latency (time to first token when streaming)")
+	parser.add_argument("--jitter-ms", type=float, default=100.0, help="spread of the latency distribution")
+	parser.add_argument("--chunk-ms", type=float, default=20.0, help="delay between streamed chunks")
+
+	parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+	parser.add_argument("--error-status", type=int, choices=[500, 503], default=503)
+	parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that hang")
+	parser.add_argument("--timeout-seconds", type=float, default=30.0)
+
+	parser.add_argument("--think", action="store_true", help="wrap responses with <think> blocks")
+
+	return parser.parse_args(argv)
+
+def main():
+	logging.basicConfig(level=logging.INFO)
+	args = parse_args()
+	web.run_app(build_app(args), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+	main()
@@ -11,6 +11,20 @@ from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+MODERATION_SYSTEM_PROMPT = """
+Parse the user's Discord moderation request and respond with ONLY a JSON object with these fields:
+- "action": one of: ban, kick, timeout, unban, untimeout
+- "target_mention": the exact mention string (like <@123>) if found, otherwise null
+- "reason": the reason give, or null if none
+- "duration": duration in minutes for timeouts, or null
+- "confidence": confidence score between 0.00 and 1.00 (1 = very certain this is a moderation request, 0 = very certain this is NOT a moderation request)
+Examples:
+"ban <@123> for spamming" -> {"action": "ban", "target_mention": "<@123>", "reason": "for spamming", "duration": null, "confidence": 0.92}
+"timeout <@badperson> 10 minutes being mean" -> {"action": "timeout", "target_mention": "<@badperson>", "reason": "being mean", "duration": 10, "confidence": 0.85}
+
+JSON Response only (NO CODE BLOCKS OR OTHER RESPONSE - PLAINTEXT ONLY)
+"""
+
 class ModerationAction(Enum):
 	BAN = "ban"
 	KICK = "kick"
@@ -51,23 +65,15 @@ class ModerationParser:
 
 	@classmethod
 	async def parse_moderation_intent(cls, message: str) -> Optional[ModerationIntent]:
-		parsing_prompt = f"""
-Parse this Discord moderation request and respond with ONLY a JSON object with these fields:
-- "action": one of: ban, kick, timeout, unban, untimeout
-- "target_mention": the exact mention string (like <@123>) if found, otherwise null
-- "reason": the reason give, or null if none
-- "duration": duration in minutes for timeouts, or null
-- "confidence": confidence score between 0.00 and 1.00 (1 = very certain this is a moderation request, 0 = very certain this is NOT a moderation request)
-Message to parse: "{message}"
-Examples:
-"ban <@123> for spamming" -> {{"action": "ban", "target_mention": "<@123>", "reason": "for spamming", "duration": null, "confidence": 0.92}}
-"timeout <@badperson> 10 minutes being mean" -> {{"action": "timeout", "target_mention": "<@badperson>", "reason": "being mean", "duration": 10, "confidence": 0.85}}
-
-JSON Response only (NO CODE BLOCKS OR OTHER RESPONSE - PLAINTEXT ONLY):
-"""
+		parsing_prompt = f'Message to parse: "{message}"'
 
 		try:
-			ai_response = await ai_handler.generate_ai_response(parsing_prompt)
+			ai_response = await ai_handler.generate_ai_response(
+				parsing_prompt,
+				"moderation",
+				profile="moderation_json",
+				system_prompt=MODERATION_SYSTEM_PROMPT
+			)
 
 			logger.debug(f"Moderation AI response: {ai_response}")
 
@@ -213,7 +219,7 @@ class ModerationConfirmationView(discord.ui.View):
 		bot_instance = interaction.client
 		if hasattr(bot_instance, "build_prompt"):
 			prompt = bot_instance.build_prompt(self.original_message)
-			ai_response = await ai_handler.generate_ai_response(prompt)
+			ai_response = await ai_handler.generate_ai_response(prompt, profile="chat_short", system_prompt=getattr(bot_instance, "SYSTEM_PROMPT", None))
 
 			await self.original_message.reply(ai_response)
 			await interaction.followup.send("treated as normal chat :3", ephemeral=True)
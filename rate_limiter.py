@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from config import RATE_LIMIT_CONFIG, RatePolicy
+
+logger = logging.getLogger(__name__)
+
+class _Policy:
+	# gcra - one "theoretical arrival time" per key instead of a deque of timestamps
+	__slots__ = ("name", "interval", "tolerance", "allowed", "rejected")
+
+	def __init__(self, name: str, policy: RatePolicy):
+		self.name = name
+		self.interval = policy.window / policy.limit
+		self.tolerance = self.interval * ((policy.burst or policy.limit) - 1)
+
+		self.allowed = 0
+		self.rejected = 0
+
+def gcra(checks: List[Tuple[_Policy, str]], tats: List[Optional[float]], now: float) -> Tuple[float, List[float]]:
+	# returns (seconds until every check would pass, new tats) - 0 means allowed
+	retry_after = 0.0
+	updated = []
+
+	for (policy, _), tat in zip(checks, tats):
+		tat = max(tat or now, now)
+
+		if tat - now > policy.tolerance:
+			retry_after = max(retry_after, tat - policy.tolerance - now)
+			policy.rejected += 1
+
+		updated.append(tat + policy.interval)
+
+	return retry_after, updated
+
+class MemoryBackend:
+	shared = False
+
+	def __init__(self, evict_per_check: int = RATE_LIMIT_CONFIG.EVICT_PER_CHECK):
+		self.evict_per_check = evict_per_check
+		# oldest update first per policy, so idle keys collect at the front
+		self.tats: Dict[str, OrderedDict] = {}
+
+	def _evict(self, tats: OrderedDict, now: float):
+		# a key whose tat has passed is indistinguishable from one we've never seen
+		for _ in range(self.evict_per_check):
+			if not tats:
+				return
+
+			key, tat = next(iter(tats.items()))
+			if tat > now:
+				return
+
+			del tats[key]
+
+	def check_many(self, checks: List[Tuple[_Policy, str]], now: float) -> float:
+		tables = [self.tats.setdefault(policy.name, OrderedDict()) for policy, _ in checks]
+		retry_after, updated = gcra(checks, [table.get(key) for table, (_, key) in zip(tables, checks)], now)
+
+		if retry_after > 0:
+			return retry_after
+
+		for table, (_, key), tat in zip(tables, checks, updated):
+			table[key] = tat
+			table.move_to_end(key)
+			self._evict(table, now)
+
+		return 0.0
+
+	def count(self, policy: str) -> int:
+		return len(self.tats.get(policy, ()))
+
+	def close(self):
+		pass
+
+class SQLiteBackend:
+	# shared between every process pointed at the same file, one transaction per check_many
+	shared = True
+
+	def __init__(self, path: str, evict_per_check: int = RATE_LIMIT_CONFIG.EVICT_PER_CHECK, busy_timeout: float = RATE_LIMIT_CONFIG.DB_BUSY_TIMEOUT):
+		self.path = path
+		self.evict_per_check = evict_per_check
+		self._lock = threading.Lock()
+		self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+		self._conn.execute("PRAGMA journal_mode=WAL")
+		self._conn.execute("PRAGMA synchronous=NORMAL")
+		self._conn.execute(
+			"CREATE TABLE IF NOT EXISTS rate_limits ("
+			"policy TEXT NOT NULL, "
+			"key TEXT NOT NULL, "
+			"tat REAL NOT NULL, "
+			"PRIMARY KEY (policy, key)) WITHOUT ROWID"
+		)
+		self._conn.execute("CREATE INDEX IF NOT EXISTS rate_limits_tat ON rate_limits (tat)")
+
+	def check_many(self, checks: List[Tuple[_Policy, str]], now: float) -> float:
+		with self._lock:
+			conn = self._conn
+			# immediate takes the write lock up front so two processes can't both read the same tat
+			conn.execute("BEGIN IMMEDIATE")
+			try:
+				tats = [
+					(conn.execute("SELECT tat FROM rate_limits WHERE policy = ? AND key = ?", (policy.name, key)).fetchone() or (None,))[0]
+					for policy, key in checks
+				]
+				retry_after, updated = gcra(checks, tats, now)
+
+				if retry_after <= 0:
+					conn.executemany(
+						"INSERT OR REPLACE INTO rate_limits (policy, key, tat) VALUES (?, ?, ?)",
+						[(policy.name, key, tat) for (policy, key), tat in zip(checks, updated)]
+					)
+					conn.execute(
+						"DELETE FROM rate_limits WHERE (policy, key) IN (SELECT policy, key FROM rate_limits WHERE tat <= ? LIMIT ?)",
+						(now, self.evict_per_check * len(checks))
+					)
+
+				conn.execute("COMMIT")
+			except BaseException:
+				conn.execute("ROLLBACK")
+				raise
+
+		return retry_after
+
+	def count(self, policy: str) -> int:
+		with self._lock:
+			return self._conn.execute("SELECT COUNT(*) FROM rate_limits WHERE policy = ?", (policy,)).fetchone()[0]
+
+	def close(self):
+		with self._lock:
+			self._conn.close()
+
+class RateLimiter:
+	def __init__(
+		self,
+		policies: Dict[str, RatePolicy],
+		backend=None,
+		clock: Callable[[], float] = time.monotonic
+	):
+		self.backend = backend or MemoryBackend()
+		self.clock = clock
+		self.policies: Dict[str, _Policy] = {name: _Policy(name, policy) for name, policy in policies.items()}
+
+	def _policy(self, name: str) -> _Policy:
+		policy = self.policies.get(name)
+		if not policy:
+			raise ValueError(f"unknown rate limit policy {name!r}")
+
+		return policy
+
+	def check(self, policy: str, key: Hashable) -> Tuple[bool, float]:
+		return self.check_many(((policy, key),))
+
+	def check_many(self, checks: Iterable[Tuple[str, Hashable]]) -> Tuple[bool, float]:
+		# all or nothing - returns (allowed, seconds until it would be), nothing is consumed unless every check passes
+		resolved = [(self._policy(name), str(key)) for name, key in checks]
+
+		try:
+			retry_after = self.backend.check_many(resolved, self.clock())
+		except sqlite3.Error as e:
+			# shared state being unavailable shouldn't take the bot down with it
+			logger.warning(f"rate limit check failed, allowing: {e}")
+			return True, 0.0
+
+		if retry_after > 0:
+			return False, retry_after
+
+		for policy, _ in resolved:
+			policy.allowed += 1
+
+		return True, 0.0
+
+	def get_stats(self) -> dict:
+		return {
+			name: {
+				"keys": self.backend.count(name),
+				"allowed": policy.allowed,
+				"rejected": policy.rejected
+			}
+			for name, policy in self.policies.items()
+		}
+
+	def close(self):
+		self.backend.close()
+
+def _build_limiter() -> RateLimiter:
+	if RATE_LIMIT_CONFIG.DB_PATH:
+		# monotonic clocks aren't comparable across processes or restarts, wall clock is
+		return RateLimiter(RATE_LIMIT_CONFIG.POLICIES, SQLiteBackend(RATE_LIMIT_CONFIG.DB_PATH), clock=time.time)
+
+	return RateLimiter(RATE_LIMIT_CONFIG.POLICIES)
+
+_limiter = _build_limiter()
+
+async def check(policy: str, key: Hashable) -> Tuple[bool, float]:
+	return await check_many(((policy, key),))
+
+async def check_many(checks: Iterable[Tuple[str, Hashable]]) -> Tuple[bool, float]:
+	if _limiter.backend.shared:
+		# may wait on another process holding the lock, keep that off the event loop
+		return await asyncio.to_thread(_limiter.check_many, list(checks))
+
+	return _limiter.check_many(checks)
+
+def get_stats() -> dict:
+	return _limiter.get_stats()
+
+def close():
+	_limiter.close()
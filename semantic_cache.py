@@ -0,0 +1,130 @@
+import logging
+import random
+import re
+import numpy as np
+from collections import OrderedDict
+from config import AI_CONFIG
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ":3", ";)", "^_^", "T_T" and friends, whole tokens only so "2+2" survives
+EMOTICONS = re.compile(r"(?<!\S)(?:[:;=]\S+|\S*_\S*)(?!\S)")
+# the placeholders MessageParser swaps mentions for, every guild message starts with one so they'd make everything look alike
+MENTIONS = re.compile(r"\((?:yourself|me\|myself)\)")
+# digits and operators stay, "10+10" and "10+11" are different questions
+NON_WORD = re.compile(r"[^\w +\-*/=<>^%]+")
+REPEATS = re.compile(r"([^\W\d])\1+")
+
+# different words, same message
+GREETINGS = {"hello", "helo", "hey", "heya", "hiya", "henlo", "yo", "sup", "hai", "haii", "howdy", "hewo"}
+
+# knuth's multiplicative hash, spreads the 24 bit trigram ids over the table
+HASH_MULTIPLIER = np.uint32(2654435761)
+
+def normalise(text: str) -> str:
+	# mentions, case, emoticons / punctuation, stretched letters ("hiiii", not "11") and greeting words all folded away
+	text = EMOTICONS.sub(" ", MENTIONS.sub(" ", text.lower()))
+	words = REPEATS.sub(r"\1", NON_WORD.sub(" ", text)).split()
+	return " ".join("hi" if word in GREETINGS else word for word in words)
+
+# only small talk is cached, one letter is all that separates "cats" from "bats" or "10+10" from "10+11"
+# kept as normalised words so it matches whatever normalise() makes of the prompt
+SMALL_TALK = set(normalise(
+	"hi anya good morning afternoon evening night gm gn goodnight nite how are r you u ya doing today what whats wyd wbu hru "
+	"sup up ty thanks thank thx bye cya see later ok okay lol lmao haha i im me am miss love too again back there everyone"
+).split())
+
+def is_small_talk(text: str) -> bool:
+	words = normalise(text).split()
+	return bool(words) and all(word in SMALL_TALK for word in words)
+
+class SemanticCache:
+	def __init__(
+		self,
+		max_entries: int = AI_CONFIG.SEMANTIC_CACHE_MAX_ENTRIES,
+		threshold: float = AI_CONFIG.SEMANTIC_CACHE_THRESHOLD,
+		variants: int = AI_CONFIG.SEMANTIC_CACHE_VARIANTS,
+		dimensions: int = AI_CONFIG.SEMANTIC_CACHE_DIMENSIONS
+	):
+		if dimensions & (dimensions - 1):
+			raise ValueError(f"dimensions must be a power of two, got {dimensions}")
+
+		self.max_entries = max_entries
+		self.threshold = threshold
+		self.variants = variants
+		self.dimensions = dimensions
+		self._shift = np.uint32(32 - (dimensions.bit_length() - 1))
+
+		# one row per entry, filled from the top and reused in place on eviction, so rows [0, len(lru)) are always the live ones
+		self.vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+		self.replies: List[List[str]] = [[] for _ in range(max_entries)]
+		self.lru: OrderedDict[int, None] = OrderedDict()
+
+		self.hits = 0
+		self.misses = 0
+
+	def vectorise(self, text: str) -> Optional[np.ndarray]:
+		data = np.frombuffer(f" {normalise(text)} ".encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+		if data.size < 3:
+			return None
+
+		# every byte trigram as one 24 bit id, hashed into a bucket
+		trigrams = (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+		buckets = (trigrams * HASH_MULTIPLIER) >> self._shift
+
+		vector = np.bincount(buckets, minlength=self.dimensions).astype(np.float32)
+		return vector / np.linalg.norm(vector)
+
+	def _closest(self, vector: np.ndarray) -> Optional[int]:
+		if not self.lru:
+			return None
+
+		scores = self.vectors[:len(self.lru)] @ vector
+		best = int(np.argmax(scores))
+
+		return best if scores[best] >= self.threshold else None
+
+	def get(self, prompt: str) -> Optional[str]:
+		vector = self.vectorise(prompt)
+		row = self._closest(vector) if vector is not None else None
+
+		# entries still collecting variants don't count, the model gets asked and add() fills them in
+		if row is None or len(self.replies[row]) < self.variants:
+			self.misses += 1
+			return None
+
+		self.hits += 1
+		self.lru.move_to_end(row)
+		return random.choice(self.replies[row])
+
+	def add(self, prompt: str, reply: str):
+		vector = self.vectorise(prompt)
+		if vector is None:
+			return
+
+		row = self._closest(vector)
+		if row is None:
+			if len(self.lru) < self.max_entries:
+				row = len(self.lru)
+			else:
+				row, _ = self.lru.popitem(last=False)
+				self.replies[row] = []
+
+			self.vectors[row] = vector
+			self.lru[row] = None
+
+		# repeats are kept too, a model that always says the same thing still fills the entry (and gets weighted towards it)
+		if len(self.replies[row]) < self.variants:
+			self.replies[row].append(reply)
+
+		self.lru.move_to_end(row)
+
+	def get_stats(self) -> dict:
+		lookups = self.hits + self.misses
+		return {
+			"entries": len(self.lru),
+			"hits": self.hits,
+			"misses": self.misses,
+			"hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+		}
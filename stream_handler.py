@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import random
+import time
+import discord
+from config import AI_CONFIG
+from typing import Optional, Callable, Awaitable, AsyncIterator, Sequence
+
+logger = logging.getLogger(__name__)
+
+DISCORD_MESSAGE_LIMIT = 2000
+EMBED_DESCRIPTION_LIMIT = 4096
+
+class StreamingReply:
+	def __init__(
+		self,
+		send: Callable[..., Awaitable[discord.Message]],
+		render: Callable[[str], dict],
+		edit_interval: float = AI_CONFIG.STREAM_EDIT_INTERVAL,
+		placeholders: Optional[Sequence[str]] = None,
+		soft_deadline: float = AI_CONFIG.SOFT_DEADLINE
+	):
+		self.send = send
+		self.render = render
+		self.edit_interval = edit_interval
+		self.placeholders = placeholders
+		self.soft_deadline = soft_deadline
+
+		self.message: Optional[discord.Message] = None
+		self.shown_text = ""
+		self.used_placeholder = False
+		self._showing_placeholder = False
+		self._finished = False
+		self._last_edit = 0.0
+		self._lock = asyncio.Lock()
+
+	async def _show(self, text: str):
+		async with self._lock:
+			if text == self.shown_text:
+				return
+
+			if self.message:
+				await self.message.edit(**self.render(text))
+			else:
+				self.message = await self.send(**self.render(text))
+
+			self.shown_text = text
+			self._showing_placeholder = False
+			self._last_edit = time.monotonic()
+
+	async def _placeholder_after_deadline(self):
+		await asyncio.sleep(self.soft_deadline)
+
+		async with self._lock:
+			if self.message or self._finished:
+				return
+
+			text = random.choice(self.placeholders)
+			try:
+				self.message = await self.send(**self.render(text))
+			except discord.HTTPException as e:
+				logger.warning(f"failed to send placeholder reply: {e}")
+				return
+
+			self.shown_text = text
+			self.used_placeholder = True
+			self._showing_placeholder = True
+			self._last_edit = time.monotonic()
+
+	async def _finish(self, timer: Optional[asyncio.Task]):
+		if not timer:
+			return
+
+		# under the lock so the timer either already posted or never will
+		async with self._lock:
+			self._finished = True
+
+		timer.cancel()
+		await asyncio.gather(timer, return_exceptions=True)
+
+	async def _discard_placeholder(self):
+		if not self._showing_placeholder:
+			return
+
+		try:
+			await self.message.delete()
+		except discord.HTTPException as e:
+			logger.warning(f"failed to delete placeholder reply: {e}")
+
+		self.message = None
+		self.shown_text = ""
+		self._showing_placeholder = False
+
+	async def run(self, chunks: AsyncIterator[str]) -> str:
+		text = ""
+		timer = None
+
+		if self.placeholders and self.soft_deadline > 0:
+			timer = asyncio.create_task(self._placeholder_after_deadline())
+
+		try:
+			async for chunk in chunks:
+				text += chunk
+				visible = text.strip()
+
+				if not visible:
+					continue
+
+				# first chunk goes out straight away (replacing the placeholder if there is one), everything after is throttled
+				if not self.message or self._showing_placeholder or time.monotonic() - self._last_edit >= self.edit_interval:
+					try:
+						await self._show(visible)
+					except discord.HTTPException as e:
+						logger.warning(f"failed to update streamed reply: {e}")
+		except BaseException:
+			await self._finish(timer)
+			await self._discard_placeholder()
+			raise
+
+		await self._finish(timer)
+
+		visible = text.strip()
+		if visible:
+			await self._show(visible)
+		else:
+			# request failed, don't leave the placeholder pretending to be a reply
+			await self._discard_placeholder()
+
+		return visible
+
+async def single_chunk(response: Awaitable[Optional[str]]) -> AsyncIterator[str]:
+	# lets a non streamed response go through StreamingReply for the placeholder handling
+	text = await response
+	if text:
+		yield text
+
+def render_content(text: str) -> dict:
+	return {
+		"content": text[:DISCORD_MESSAGE_LIMIT]
+	}
@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_handler import ReactionHeaderParser
+
+def stream(response: str) -> str:
+	# one character at a time, the worst case for the header buffering
+	parser = ReactionHeaderParser()
+	return ("".join(parser.feed(char) for char in response) + parser.flush()).strip()
+
+def test_header_and_reply_on_one_line():
+	result = ReactionHeaderParser().parse("REACTION: 😂 hi there")
+	assert (result.reply, result.reaction, result.structured) == ("hi there", "😂", True)
+	assert stream("REACTION: 😂 hi there") == "hi there"
+
+def test_long_reply_on_the_header_line_is_not_leaked():
+	response = "Reaction: 😂 " + "this reply is a good deal longer than the header buffer " * 2
+	assert not stream(response).lower().startswith("reaction")
+
+def test_header_on_its_own_line():
+	result = ReactionHeaderParser().parse("**Reaction:** 👍\nsure thing")
+	assert (result.reply, result.reaction, result.structured) == ("sure thing", "👍", True)
+
+def test_no_header():
+	result = ReactionHeaderParser().parse("hello there, no header in this one")
+	assert (result.reply, result.reaction, result.structured) == ("hello there, no header in this one", None, False)
@@ -0,0 +1,138 @@
+import functools
+import logging
+import os
+import re
+import unicodedata
+from typing import Callable, List, Optional, Tuple
+from config import BOT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+ZERO_WIDTH = {"\u200b", "\u200c", "\u200d", "\u2060", "\ufeff", "\u00ad"}
+
+# lookalikes people use to dodge filters, each one folds to a single ascii character
+HOMOGLYPHS = {
+	# cyrillic
+	"а": "a", "е": "e", "о": "o", "р": "p", "с": "c", "у": "y", "х": "x", "і": "i", "ј": "j", "ѕ": "s", "һ": "h", "ԁ": "d", "ԛ": "q", "ԝ": "w",
+	"А": "a", "В": "b", "Е": "e", "К": "k", "М": "m", "Н": "h", "О": "o", "Р": "p", "С": "c", "Т": "t", "Х": "x", "І": "i", "Ѕ": "s",
+	# greek
+	"α": "a", "ε": "e", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x",
+	"Α": "a", "Β": "b", "Ε": "e", "Η": "h", "Ι": "i", "Κ": "k", "Μ": "m", "Ν": "n", "Ο": "o", "Ρ": "p", "Τ": "t", "Χ": "x", "Υ": "y", "Ζ": "z"
+}
+
+LEETSPEAK = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"}
+
+# lowercase + leetspeak in one bytes.translate, way quicker than str.translate or re.IGNORECASE
+_ASCII_TABLE = bytes.maketrans(
+	bytes(range(65, 91)) + "".join(LEETSPEAK).encode("ascii"),
+	bytes(range(97, 123)) + "".join(LEETSPEAK.values()).encode("ascii")
+)
+_TABLE = {**LEETSPEAK, **HOMOGLYPHS}
+
+def _fold_ascii(text: str) -> str:
+	return text.encode("ascii").translate(_ASCII_TABLE).decode("ascii")
+
+# ascii runs get folded in bulk, everything else one character at a time
+_SEGMENT = re.compile(r"[\x00-\x7f]+|[^\x00-\x7f]")
+
+@functools.lru_cache(maxsize=4096)
+def _fold_char(char: str) -> str:
+	if char in ZERO_WIDTH:
+		return ""
+
+	folded = _TABLE.get(char)
+	if folded is None:
+		# nfkd splits fullwidth / styled letters and accents apart, then the accents get dropped
+		folded = "".join(part for part in unicodedata.normalize("NFKD", char) if not unicodedata.combining(part)).lower() or char
+		if folded.isascii():
+			folded = _fold_ascii(folded)
+
+	return folded
+
+def normalise(text: str) -> Tuple[str, Optional[List[int]]]:
+	# returns the folded (lowercased, de-leeted, ascii-fied) text and, for every character in it, the index it came from in the original
+	# None means it's 1:1 with the original, which is the case for all plain ascii messages
+	if text.isascii():
+		return _fold_ascii(text), None
+
+	chars = []
+	origin = []
+
+	for match in _SEGMENT.finditer(text):
+		segment = match.group()
+		start = match.start()
+
+		if segment.isascii():
+			chars.append(_fold_ascii(segment))
+			origin.extend(range(start, match.end()))
+			continue
+
+		folded = _fold_char(segment)
+		chars.append(folded)
+		origin.extend([start] * len(folded))
+
+	return "".join(chars), origin
+
+class TextFilter:
+	def __init__(self, rules: List[str], replacement: str = "[REDACTED]"):
+		self.rules = rules
+		self.replacement = replacement
+		# one alternation, so a single scan finds every rule's matches
+		# text is already lowercased by normalise, so no IGNORECASE (it stops re from skipping ahead quickly)
+		self.pattern = re.compile("|".join(f"(?:{rule})" for rule in rules)) if rules else None
+
+	@classmethod
+	def from_file(cls, path: str, replacement: str = "[REDACTED]") -> "TextFilter":
+		with open(path, encoding="utf-8") as file:
+			rules = [line.strip() for line in file if line.strip() and not line.lstrip().startswith("#")]
+
+		for rule in rules:
+			try:
+				re.compile(rule)
+			except re.error as e:
+				raise ValueError(f"bad rule {rule!r} in {path}: {e}")
+
+		logger.info(f"loaded {len(rules)} filter rules from {path}")
+		return cls(rules, replacement)
+
+	def search(self, text: str) -> bool:
+		if not self.pattern:
+			return False
+
+		return self.pattern.search(normalise(text)[0]) is not None
+
+	def redact(self, text: str, transform: Optional[Callable[[str], str]] = None) -> Tuple[str, bool]:
+		# transform (e.g. escaping) is applied to everything that isn't redacted, in the same pass
+		transform = transform or (lambda segment: segment)
+
+		if not self.pattern:
+			return transform(text), False
+
+		normalised, origin = normalise(text)
+
+		parts = []
+		position = 0
+		for match in self.pattern.finditer(normalised):
+			start, end = match.span()
+			if start == end:
+				continue
+
+			# map the match back onto the original text so everything outside it stays untouched
+			if origin is not None:
+				start, end = origin[start], origin[end - 1] + 1
+
+			parts.append(transform(text[position:start]))
+			parts.append(self.replacement)
+			position = end
+
+		if not parts:
+			return transform(text), False
+
+		parts.append(transform(text[position:]))
+		return "".join(parts), True
+
+def load_rule_set(name: str) -> TextFilter:
+	return TextFilter.from_file(os.path.join(BOT_CONFIG.FILTER_RULES_DIR, f"{name}.txt"))
+
+PROMPT_INJECTION = load_rule_set("prompt_injection")
+NSFW = load_rule_set("nsfw")
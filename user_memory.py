@@ -0,0 +1,229 @@
+import logging
+import os
+import re
+import zlib
+import numpy as np
+from config import USER_MEMORY_CONFIG
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+SENTENCE_PATTERN = re.compile(r"[^.!?\n]+[.!?]*")
+
+# first person statements worth remembering, questions are skipped separately
+FACT_PATTERN = re.compile(
+	r"\b(?:i am|i'm|im|i was|i have|i've|i got|i like|i love|i hate|i prefer|i work|i live|i study|i play|i use|i own|"
+	r"my [a-z']+(?: [a-z']+)? (?:is|are|was)|call me)\b",
+	re.IGNORECASE
+)
+
+# every fact is full of these, so they'd make everything look similar to everything else
+STOPWORDS = {
+	"i", "im", "i'm", "me", "my", "mine", "you", "your", "a", "an", "the", "is", "am", "are", "was", "be", "been",
+	"and", "or", "but", "to", "of", "in", "on", "at", "for", "with", "it", "its", "it's", "that", "this", "so",
+	"do", "did", "have", "has", "had", "i've", "got", "really", "very", "just", "too", "also", "what", "how", "about"
+}
+
+# bigrams help tell "cat food" from "food" and "cat", but shouldn't outweigh the words themselves
+BIGRAM_WEIGHT = 0.5
+
+def tokenise(text: str) -> List[str]:
+	tokens = []
+	for token in TOKEN_PATTERN.findall(text.lower()):
+		if token in STOPWORDS:
+			continue
+		# cheap plural folding so "cats" finds "cat"
+		tokens.append(token[:-1] if len(token) > 3 and token.endswith("s") else token)
+
+	return tokens
+
+def vectorise(text: str, dimensions: int = USER_MEMORY_CONFIG.DIMENSIONS) -> np.ndarray:
+	# hashed unigrams + bigrams, crc32 rather than hash() so vectors on disk survive a restart
+	tokens = tokenise(text)
+	vector = np.zeros(dimensions, dtype=np.float32)
+	if not tokens:
+		return vector
+
+	features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+	hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint32, count=len(features))
+
+	weights = np.ones(len(features), dtype=np.float32)
+	weights[len(tokens):] = BIGRAM_WEIGHT
+
+	# top bit picks the sign so collisions cancel out instead of piling up
+	np.add.at(vector, hashes % dimensions, np.where(hashes >> 31, -weights, weights))
+
+	norm = np.linalg.norm(vector)
+	if norm:
+		vector /= norm
+
+	return vector
+
+def extract_facts(text: str, limit: int = USER_MEMORY_CONFIG.MAX_PER_MESSAGE) -> List[str]:
+	facts = []
+
+	for sentence in SENTENCE_PATTERN.findall(text):
+		sentence = " ".join(sentence.split())
+		if sentence.endswith("?") or "[REDACTED]" in sentence:
+			continue
+
+		if 12 <= len(sentence) <= 200 and FACT_PATTERN.search(sentence):
+			facts.append(sentence)
+			if len(facts) >= limit:
+				break
+
+	return facts
+
+class UserMemory:
+	# one row per fact in a fixed size ring: vectors, owner ids and utf-8 text side by side
+	# with a directory the arrays are memory mapped .npy files, so nothing is loaded or saved in bulk
+	def __init__(
+		self,
+		directory: Optional[str] = USER_MEMORY_CONFIG.DIR,
+		capacity: int = USER_MEMORY_CONFIG.CAPACITY,
+		dimensions: int = USER_MEMORY_CONFIG.DIMENSIONS,
+		max_fact_bytes: int = USER_MEMORY_CONFIG.MAX_FACT_BYTES,
+		max_per_user: int = USER_MEMORY_CONFIG.MAX_PER_USER
+	):
+		self.directory = directory
+		self.capacity = capacity
+		self.dimensions = dimensions
+		self.max_fact_bytes = max_fact_bytes
+		self.max_per_user = max_per_user
+
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+
+		self.vectors = self._array("vectors", (capacity, dimensions), np.float32)
+		self.owners = self._array("owners", (capacity,), np.int64)
+		self.texts = self._array("texts", (capacity,), f"S{max_fact_bytes}")
+		# when each row was last written, in facts added so far - lets a user's oldest fact be found
+		self.serials = self._array("serials", (capacity,), np.int64)
+		# total facts ever added, the next row is total % capacity
+		self.state = self._array("state", (1,), np.int64)
+
+		self.searches = 0
+		self.added = 0
+		self.replaced = 0
+
+	def _array(self, name: str, shape: tuple, dtype) -> np.ndarray:
+		if not self.directory:
+			return np.zeros(shape, dtype=dtype)
+
+		path = os.path.join(self.directory, f"{name}.npy")
+		if os.path.exists(path):
+			array = np.lib.format.open_memmap(path, mode="r+")
+			if array.shape == shape and array.dtype == np.dtype(dtype):
+				return array
+
+			# capacity / dimensions changed, old vectors can't be compared with new ones anyway
+			logger.warning(f"{path} is {array.shape} {array.dtype}, expected {shape} {np.dtype(dtype)}, starting over")
+			del array
+
+		return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+	@property
+	def size(self) -> int:
+		return int(min(self.state[0], self.capacity))
+
+	def _rows_for(self, user_id: int) -> np.ndarray:
+		return np.flatnonzero(self.owners[:self.size] == user_id)
+
+	def search(self, user_id: int, text: str, k: int = USER_MEMORY_CONFIG.TOP_K, min_similarity: float = USER_MEMORY_CONFIG.MIN_SIMILARITY) -> List[Tuple[str, float]]:
+		self.searches += 1
+
+		query = vectorise(text, self.dimensions)
+		if not query.any():
+			return []
+
+		rows = self._rows_for(user_id)
+		if not rows.size:
+			return []
+
+		# rows are unit length, so the dot product is the cosine
+		scores = self.vectors[rows] @ query
+		top = np.argpartition(-scores, k)[:k] if rows.size > k else np.arange(rows.size)
+		top = top[np.argsort(-scores[top])]
+
+		return [
+			(self.texts[rows[index]].decode("utf-8", "ignore"), float(scores[index]))
+			for index in top
+			if scores[index] >= min_similarity
+		]
+
+	def add(self, user_id: int, fact: str, duplicate_similarity: float = USER_MEMORY_CONFIG.DUPLICATE_SIMILARITY) -> bool:
+		vector = vectorise(fact, self.dimensions)
+		if not vector.any():
+			return False
+
+		# cut on a character boundary so the stored bytes always decode
+		encoded = fact.encode("utf-8")[:self.max_fact_bytes].decode("utf-8", "ignore").encode("utf-8")
+
+		row = None
+		rows = self._rows_for(user_id)
+		if rows.size:
+			scores = self.vectors[rows] @ vector
+			best = int(np.argmax(scores))
+			if scores[best] >= duplicate_similarity:
+				# same fact again (or an update of it), keep the newer wording in its place
+				row = int(rows[best])
+				self.replaced += 1
+			elif rows.size >= self.max_per_user:
+				row = int(rows[np.argmin(self.serials[rows])])
+				self.replaced += 1
+
+		new = row is None
+		if new:
+			row = int(self.state[0] % self.capacity)
+			self.added += 1
+
+		self.vectors[row] = vector
+		self.owners[row] = user_id
+		self.texts[row] = encoded
+		self.serials[row] = self.state[0]
+
+		if new:
+			# bumped last so a crash mid write never exposes a half written row
+			self.state[0] += 1
+
+		return True
+
+	def remember(self, user_id: int, text: str) -> int:
+		facts = extract_facts(text)
+		return sum(self.add(user_id, fact) for fact in facts)
+
+	def render(self, user_id: int, text: str, max_chars: int = USER_MEMORY_CONFIG.PROMPT_CHARS, already_shown: str = "") -> str:
+		lines = []
+		budget = max_chars
+
+		for fact, _ in self.search(user_id, text):
+			# e.g. said a minute ago and still in the channel's recent conversation
+			if fact in already_shown:
+				continue
+
+			line = f"- {fact}"
+			if len(line) > budget:
+				break
+
+			budget -= len(line) + 1
+			lines.append(line)
+
+		return "\n".join(lines)
+
+	def flush(self):
+		for array in (self.vectors, self.owners, self.texts, self.serials, self.state):
+			if isinstance(array, np.memmap):
+				array.flush()
+
+	def close(self):
+		self.flush()
+
+	def get_stats(self) -> dict:
+		return {
+			"facts": self.size,
+			"capacity": self.capacity,
+			"added": self.added,
+			"replaced": self.replaced,
+			"searches": self.searches
+		}